@@ -0,0 +1,108 @@
+"""
+Analysis Cache
+Content-addressed on-disk cache of transcript analyses and segmentation plans
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+# Per-line tables are only needed to build a plan; the cached plan replaces them
+TRANSIENT_ANALYSIS_KEYS = ('line_offsets', 'line_tokens', 'line_boundaries')
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class JsonCache:
+    """
+    Stores JSON entries as files named by a key derived from a content hash.
+
+    Entries are touched on every hit; when the folder grows past max_bytes the
+    least recently used entries are evicted first.
+    """
+
+    def __init__(self, cache_folder: str, max_bytes: int = 64 * 1024 * 1024):
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        os.makedirs(cache_folder, exist_ok=True)
+
+    def key(self, content_hash: str, variant: str = '') -> str:
+        """Cache key for a content hash under a given configuration variant"""
+        return hashlib.sha256(f"{content_hash}|{variant}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_folder, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return entry
+
+    def put_entry(self, key: str, entry: Dict[str, Any]):
+        """Store an entry, then evict old entries if over budget"""
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for item in os.scandir(self.cache_folder):
+            if not item.name.endswith('.json'):
+                continue
+            # Another worker may evict or replace the entry while we look
+            try:
+                if not item.is_file():
+                    continue
+                stat = item.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, item.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+class AnalysisCache(JsonCache):
+    """{analysis, plan} entries keyed by transcript hash and segmenter configuration"""
+
+    def put(self, key: str, analysis, plan: list):
+        """Store an analysis (a TranscriptAnalysis) without its per-line tables, together with its plan"""
+        self.put_entry(key, {
+            'analysis': analysis.to_dict(exclude=TRANSIENT_ANALYSIS_KEYS),
+            'plan': [segment.to_dict() for segment in plan]
+        })
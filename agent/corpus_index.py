@@ -0,0 +1,212 @@
+"""
+Corpus Index
+SQLite index of where each hadith and chapter is taught across all lectures
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from tokenizer import CHAPTER, HADITH, TIMESTAMP, iter_tokens
+from transcript_reader import TranscriptReader
+
+
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lectures (
+    lecture INTEGER PRIMARY KEY,
+    transcript_file TEXT,
+    source_hash TEXT,
+    part_count INTEGER,
+    output_file TEXT,
+    finalized_at TEXT
+);
+CREATE TABLE IF NOT EXISTS parts (
+    lecture INTEGER,
+    part INTEGER,
+    segment_hash TEXT,
+    start_line INTEGER,
+    end_line INTEGER,
+    first_timestamp TEXT,
+    last_timestamp TEXT,
+    PRIMARY KEY (lecture, part)
+);
+CREATE TABLE IF NOT EXISTS hadith (
+    number INTEGER,
+    lecture INTEGER,
+    part INTEGER,
+    line INTEGER,
+    start_timestamp TEXT,
+    end_timestamp TEXT
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    title TEXT,
+    lecture INTEGER,
+    part INTEGER,
+    line INTEGER,
+    start_timestamp TEXT,
+    end_timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS hadith_number ON hadith (number);
+CREATE INDEX IF NOT EXISTS hadith_part ON hadith (lecture, part);
+CREATE INDEX IF NOT EXISTS chapters_title ON chapters (title);
+CREATE INDEX IF NOT EXISTS chapters_part ON chapters (lecture, part);
+"""
+
+
+def range_start(timestamp: Optional[str]) -> Optional[str]:
+    """'1:05' of '1:05' or '1:05-1:40'"""
+    return timestamp.split('-')[0] if timestamp else None
+
+
+def range_end(timestamp: Optional[str]) -> Optional[str]:
+    """'1:40' of '1:40' or '1:05-1:40'"""
+    return timestamp.split('-')[-1] if timestamp else None
+
+
+class CorpusIndex:
+    """
+    Maps hadith numbers and chapter titles to (lecture, part, timestamp range).
+
+    A hadith is taught from the timestamp before its mention until the next
+    hadith or chapter starts (or its part ends); a chapter until the next
+    chapter. Lines are transcript lines, so parts are re-indexed when their
+    segment hash or their line range changes: after an incremental prepare
+    that touches just the parts that changed and those that moved.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        # Several prepare workers may update the index at once
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        # Rollback journal like jobs.db: the index sits in working/, which may be shared between machines
+        self.connection.execute('PRAGMA journal_mode=DELETE')
+
+        # Stages and workers opening a new index together must not each (re)create it under the others
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                for table in ('lectures', 'parts', 'hadith', 'chapters'):
+                    self.connection.execute(f'DROP TABLE IF EXISTS {table}')
+                for statement in SCHEMA.split(';'):
+                    if statement.strip():
+                        self.connection.execute(statement)
+                self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+
+    def close(self):
+        self.connection.close()
+
+    def update_lecture(self, lecture_num: int, transcript_file: str, source_hash: Optional[str],
+                       plan: List[Dict[str, Any]], segment_hashes: Dict[int, str]) -> int:
+        """Re-index the parts of a lecture that changed or moved; returns how many were indexed"""
+        indexed = {row['part']: tuple(row)[1:] for row in self.connection.execute(
+            'SELECT part, segment_hash, start_line, end_line FROM parts WHERE lecture = ?', (lecture_num,))}
+
+        stale = [segment for segment in plan
+                 if indexed.get(segment['part_number']) != (segment_hashes.get(segment['part_number']),
+                                                            segment['start_line'], segment['end_line'])]
+        dropped = set(indexed) - {segment['part_number'] for segment in plan}
+
+        with self.connection:
+            for part_num in dropped:
+                self._delete_part(lecture_num, part_num)
+
+            if stale:
+                with TranscriptReader(transcript_file) as source:
+                    for segment in stale:
+                        # Index the segment itself, not its overlap context
+                        text = source.text(segment['start_offset'], segment['end_offset'])
+                        self._index_part(lecture_num, segment, segment_hashes.get(segment['part_number']), text)
+
+            self.connection.execute(
+                'INSERT INTO lectures (lecture, transcript_file, source_hash, part_count) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (lecture) DO UPDATE SET transcript_file = excluded.transcript_file, '
+                'source_hash = excluded.source_hash, part_count = excluded.part_count',
+                (lecture_num, transcript_file, source_hash, len(plan)))
+
+        return len(stale)
+
+    def mark_finalized(self, lecture_num: int, output_file: str):
+        """Record where a lecture's comprehensive notes were written"""
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO lectures (lecture, output_file, finalized_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (lecture) DO UPDATE SET output_file = excluded.output_file, '
+                'finalized_at = excluded.finalized_at',
+                (lecture_num, output_file, datetime.now().isoformat(timespec='seconds')))
+
+    def find_hadith(self, number: int) -> List[Dict[str, Any]]:
+        """Every place a hadith number is taught, in lecture order"""
+        return self._query(
+            'SELECT h.number, h.lecture, h.part, h.line, h.start_timestamp, h.end_timestamp, l.output_file '
+            'FROM hadith h LEFT JOIN lectures l ON l.lecture = h.lecture '
+            'WHERE h.number = ? ORDER BY h.lecture, h.part, h.line', (number,))
+
+    def find_chapter(self, title: str) -> List[Dict[str, Any]]:
+        """Chapters whose title contains the given text, in lecture order"""
+        return self._query(
+            'SELECT c.title, c.lecture, c.part, c.line, c.start_timestamp, c.end_timestamp, l.output_file '
+            'FROM chapters c LEFT JOIN lectures l ON l.lecture = c.lecture '
+            "WHERE c.title LIKE '%' || ? || '%' ORDER BY c.lecture, c.part, c.line", (title,))
+
+    def chapter_lectures(self, title: str) -> List[int]:
+        """Lectures that teach a chapter"""
+        return [row['lecture'] for row in self._query(
+            "SELECT DISTINCT lecture FROM chapters WHERE title LIKE '%' || ? || '%' ORDER BY lecture",
+            (title,))]
+
+    def _query(self, sql: str, params: Iterable[Any]) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self.connection.execute(sql, tuple(params))]
+
+    def _delete_part(self, lecture_num: int, part_num: int):
+        for table in ('parts', 'hadith', 'chapters'):
+            self.connection.execute(f'DELETE FROM {table} WHERE lecture = ? AND part = ?',
+                                    (lecture_num, part_num))
+
+    def _index_part(self, lecture_num: int, segment: Dict[str, Any], segment_hash: Optional[str], text: str):
+        part_num = segment['part_number']
+        self._delete_part(lecture_num, part_num)
+
+        hadith_rows = []
+        chapter_rows = []
+        # Rows whose end timestamp still moves with every timestamp read
+        hadith = chapter = None
+        first_timestamp = None
+        timestamp = None
+        for token in iter_tokens(text, segment['start_line'] + 1):
+            if token.kind == TIMESTAMP:
+                timestamp = token.value
+                first_timestamp = first_timestamp or timestamp
+                for row in (hadith, chapter):
+                    if row:
+                        row[-1] = range_end(timestamp)
+            elif token.kind == HADITH:
+                # Repeated mentions (a bilingual line names it twice) continue the same hadith
+                if hadith and hadith[0] == token.value:
+                    continue
+                hadith = [token.value, lecture_num, part_num, token.line,
+                          range_start(timestamp), range_end(timestamp)]
+                hadith_rows.append(hadith)
+            elif token.kind == CHAPTER:
+                chapter = [token.value.strip(), lecture_num, part_num, token.line,
+                           range_start(timestamp), range_end(timestamp)]
+                chapter_rows.append(chapter)
+                hadith = None
+
+        self.connection.executemany('INSERT INTO hadith VALUES (?, ?, ?, ?, ?, ?)', hadith_rows)
+        self.connection.executemany('INSERT INTO chapters VALUES (?, ?, ?, ?, ?, ?)', chapter_rows)
+        self.connection.execute(
+            'INSERT INTO parts VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (lecture_num, part_num, segment_hash, segment['start_line'], segment['end_line'],
+             first_timestamp, timestamp))
@@ -0,0 +1,78 @@
+"""
+Atomic File Writer
+Background output stage for work files
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+
+class AtomicFileWriter:
+    """
+    Writes files on a small thread pool so that slow (e.g. network) storage
+    does not serialize preparation.
+
+    Every file is written to <path>.tmp and renamed into place once complete,
+    so a crash can leave a stray .tmp file but never a truncated work file.
+    Files queued together are renamed in the order given.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='writer')
+        self._pending = []
+
+    def write(self, *files: Tuple[str, bytes]):
+        """Queue (path, data) pairs to be published as one group"""
+        self._pending.append(self._pool.submit(self._publish, files))
+
+    def flush(self):
+        """Wait for every queued write; re-raise the first failure"""
+        pending, self._pending = self._pending, []
+        error = None
+        for future in pending:
+            exception = future.exception()
+            if exception and error is None:
+                error = exception
+        if error:
+            raise error
+
+    def close(self):
+        """Flush and stop the worker threads"""
+        try:
+            self.flush()
+        finally:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Let queued writes settle, but report the original error
+            try:
+                self.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _publish(files: Tuple[Tuple[str, bytes], ...]):
+        written: List[Tuple[str, str]] = []
+        try:
+            for path, data in files:
+                tmp_path = f"{path}.tmp"
+                written.append((tmp_path, path))
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+        except BaseException:
+            for tmp_path, _ in written:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            raise
+
+        for tmp_path, path in written:
+            os.replace(tmp_path, path)
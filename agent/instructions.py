@@ -0,0 +1,221 @@
+"""
+Segment Instructions
+One shared, versioned instruction template plus small per-part records
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+
+# Bump whenever INSTRUCTIONS_TEMPLATE changes so old records stop matching
+TEMPLATE_VERSION = 1
+TEMPLATE_NAME = f"instructions_template_v{TEMPLATE_VERSION}.md"
+
+# Added for parts cut with overlapping context windows
+OVERLAP_NOTE = """
+## Overlapping Context
+The opening passage of this segment repeats the end of the previous part.
+Convert it like everything else - sections whose timestamps the previous
+part already covers are removed when the parts are merged.
+"""
+
+RECORD_PATTERN = re.compile(r'^<!-- instructions: (\{.*\}) -->$', re.MULTILINE)
+
+INSTRUCTIONS_TEMPLATE = """# Processing Instructions for Lecture {lecture_num:02d} - Part {part_number}/{total_parts}
+
+## Task
+Convert this Arabic lecture transcript segment into comprehensive, professionally formatted notes.
+
+## Input File
+`L{lecture_num:02d}_PART{part_number}_segment.txt`
+
+## Output File
+`L{lecture_num:02d}_PART{part_number}_output.md`
+
+## Formatting Rules
+
+### 1. Headers (Bilingual)
+- `# Arabic Title | English Title` (Book level)
+- `## Arabic | English` (Chapter/Major section)
+- `### Arabic | English` (Subsection)
+
+### 2. Timestamps
+- `(MM:SS-MM:SS)` for ranges
+- `(MM:SS)` for single points
+- Every timestamp from source MUST appear in output
+- Place timestamp immediately after section header
+
+### 3. Text Formatting
+- **Hadith text**: Full Arabic, then full English in bold
+- **Sheikh explanations**: Arabic paragraph, then English translation
+- **Student interactions**: Mark with `[Student question]` or `[Student comment]`
+
+### 4. Content Capture Rules
+- **Zero additions**: Add NO content not in source
+- **Complete capture**: Miss NO content from source
+- **Preserve tone**: Maintain sheikh's rhetorical style
+- **Include everything**: Main teaching, digressions, side comments, questions, answers
+
+### 5. Example Format
+
+```markdown
+## الحديث الأول | Hadith 1
+(0:45-5:00)
+
+### الإسناد | Chain of Narration
+
+حَدَّثَنَا الْحُمَيْدِيُّ...
+
+Al-Humaidi narrated to us...
+
+### المتن | Text
+
+إِنَّمَا الأَعْمَالُ بِالنِّيَّاتِ
+
+**"Actions are but by intentions"**
+
+### شرح الشيخ | Sheikh's Explanation
+(4:00-4:45)
+
+هذا الحديث العظيم...
+
+This great hadith...
+
+**[Student question]** (5:00):
+ما معنى النية؟
+What is the meaning of intention?
+
+**Sheikh's answer** (5:15):
+النية محلها القلب...
+The intention is in the heart...
+```
+
+## Instructions
+
+1. Read the segment file: `L{lecture_num:02d}_PART{part_number}_segment.txt`
+2. Process ALL content following the formatting rules above
+3. Preserve all Arabic text exactly as written
+4. Provide English translations for all Arabic content
+5. Use bilingual headers throughout
+6. Include all timestamps
+7. Capture every detail from the transcript
+8. Write output to: `L{lecture_num:02d}_PART{part_number}_output.md`
+
+## Critical Reminders
+- Never skip timestamps
+- Never add content not in source
+- Always provide translations
+- Maintain proper hierarchy
+- Preserve Arabic exactly
+- Include everything (digressions, Q&A, side comments)
+"""
+
+
+def template_path(working_folder: str) -> str:
+    """Where the shared template lives in the working folder"""
+    return os.path.join(working_folder, TEMPLATE_NAME)
+
+
+def ensure_template(working_folder: str) -> str:
+    """Write the shared template unless an identical copy is already there; returns its path"""
+    path = template_path(working_folder)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == INSTRUCTIONS_TEMPLATE:
+                return path
+    except OSError:
+        pass
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(INSTRUCTIONS_TEMPLATE)
+    os.replace(tmp_path, path)
+    return path
+
+
+def instruction_fields(lecture_num: int, part_number: int, total_parts: int,
+                       overlap: bool = False) -> Dict[str, Any]:
+    """The values that differ between parts"""
+    fields = {
+        'template': TEMPLATE_NAME,
+        'version': TEMPLATE_VERSION,
+        'lecture_num': lecture_num,
+        'part_number': part_number,
+        'total_parts': total_parts
+    }
+    if overlap:
+        fields['overlap'] = True
+    return fields
+
+
+def render_record(fields: Dict[str, Any]) -> str:
+    """Per-part instructions file: the variable fields and a pointer to the shared template"""
+    lecture_num = fields['lecture_num']
+    part_number = fields['part_number']
+    return f"""<!-- instructions: {json.dumps(fields, sort_keys=True)} -->
+# Processing Instructions for Lecture {lecture_num:02d} - Part {part_number}/{fields['total_parts']}
+
+- Input file: `L{lecture_num:02d}_PART{part_number}_segment.txt`
+- Output file: `L{lecture_num:02d}_PART{part_number}_output.md`
+
+Follow `{fields['template']}` in the same folder, with lecture_num = {lecture_num},
+part_number = {part_number} and total_parts = {fields['total_parts']}.
+""" + (OVERLAP_NOTE if fields.get('overlap') else '')
+
+
+def render_instructions(fields: Dict[str, Any], template: str = INSTRUCTIONS_TEMPLATE) -> str:
+    """Full instructions for one part"""
+    instructions = template.format(**fields)
+    if fields.get('overlap'):
+        instructions += OVERLAP_NOTE
+    return instructions
+
+
+def parse_record(text: str) -> Optional[Dict[str, Any]]:
+    """Fields of a per-part record, or None for self-contained (older) instruction files"""
+    match = RECORD_PATTERN.search(text)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+# Templates read by this process, keyed by path and validated by mtime
+_template_cache: Dict[str, Tuple[float, str]] = {}
+
+
+def load_template(path: str) -> str:
+    """Read a template file once per process"""
+    mtime = os.path.getmtime(path)
+    cached = _template_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        template = f.read()
+    _template_cache[path] = (mtime, template)
+    return template
+
+
+def load_instructions(instruction_file: str) -> str:
+    """Full instructions for a part, expanding a per-part record against its cached template"""
+    with open(instruction_file, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    fields = parse_record(text)
+    if fields is None:
+        return text
+
+    path = os.path.join(os.path.dirname(instruction_file), fields['template'])
+    if os.path.exists(path):
+        template = load_template(path)
+    else:
+        # Template removed from the working folder; the built-in copy is authoritative for its version
+        if fields.get('version') != TEMPLATE_VERSION:
+            raise FileNotFoundError(f"Instruction template not found: {path}")
+        template = INSTRUCTIONS_TEMPLATE
+    return render_instructions(fields, template)
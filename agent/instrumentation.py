@@ -0,0 +1,80 @@
+"""
+Instrumentation
+Structured timing events for pipeline phases and segment writes
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+Hook = Callable[[Dict[str, Any]], None]
+
+
+class Instrumentation:
+    """
+    Measures phases and hands one event dict per phase to every registered hook.
+
+    Events carry 'event' ('phase' or 'segment'), 'name', wall_seconds,
+    cpu_seconds and whatever counters the phase filled in (bytes_read,
+    bytes_written, segments, ...). Without hooks, events are simply dropped.
+
+    cpu_seconds is the CPU time of the thread running the phase, so phases
+    of lectures running side by side in pipeline stages do not count each
+    other's work. Work a phase hands to a thread pool (file writes,
+    parallel checks, backend calls) is not included; backend calls get
+    their own segment_process events, timed in the pool threads.
+    """
+
+    def __init__(self, hooks: Optional[List[Hook]] = None):
+        self.hooks = list(hooks or [])
+
+    def add_hook(self, hook: Hook):
+        """Register a callable that receives every event"""
+        self.hooks.append(hook)
+
+    def emit(self, event: Dict[str, Any]):
+        """Send an event to all hooks"""
+        for hook in self.hooks:
+            hook(event)
+
+    @contextmanager
+    def phase(self, name: str, event: str = 'phase', **fields) -> Iterator[Dict[str, Any]]:
+        """
+        Time the enclosed block. The yielded dict is the event being built;
+        the block adds its counters to it before it is emitted.
+        """
+        record = {'event': event, 'name': name}
+        record.update(fields)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = str(e) or type(e).__name__
+            raise
+        finally:
+            record['wall_seconds'] = round(time.perf_counter() - wall_start, 6)
+            record['cpu_seconds'] = round(time.thread_time() - cpu_start, 6)
+            if self.hooks:
+                record['time'] = datetime.now().isoformat(timespec='milliseconds')
+                record['pid'] = os.getpid()
+                self.emit(record)
+
+
+class JsonLinesSink:
+    """Hook that appends each event as one JSON line; safe to share between processes"""
+
+    def __init__(self, path: str):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def __call__(self, event: Dict[str, Any]):
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        # One append per event keeps lines whole when several workers share the file
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
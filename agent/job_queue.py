@@ -0,0 +1,231 @@
+"""
+Job Queue
+Persistent SQLite queue of segment processing jobs shared by all workers
+"""
+
+import os
+import socket
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from manifest import list_manifests, existing_files
+
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    lecture INTEGER,
+    part INTEGER,
+    segment_file TEXT,
+    instruction_file TEXT,
+    output_file TEXT,
+    state TEXT DEFAULT 'pending',
+    priority INTEGER DEFAULT 0,
+    attempts INTEGER DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    error TEXT,
+    updated_at REAL,
+    PRIMARY KEY (lecture, part)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+"""
+
+# Partially processed lectures go first so finished notes come out sooner
+NEXT_JOB = """
+SELECT j.* FROM jobs j
+JOIN (SELECT lecture, AVG(state = 'done') AS progress FROM jobs GROUP BY lecture) p USING (lecture)
+WHERE j.state = 'pending' OR (j.state = 'leased' AND j.lease_expires < ?)
+ORDER BY j.priority DESC, p.progress DESC, j.lecture, j.part
+LIMIT 1
+"""
+
+
+def default_worker_id() -> str:
+    """host:pid, unique across machines sharing the working folder"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    One job per prepared part, in states pending -> leased -> done (or failed).
+
+    A lease expires after lease_seconds, so a part claimed by a worker that
+    died returns to the queue, until it has been leased max_attempts times
+    and is parked as failed. Leasing happens inside an immediate
+    transaction, so concurrent workers never claim the same part. The queue
+    is synced from the manifests and the working folder, so an output that
+    appears completes its job whoever wrote it.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 30 * 60, max_attempts: int = 3):
+        self.db_path = db_path
+        self.working_folder = os.path.dirname(db_path) or '.'
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        os.makedirs(self.working_folder, exist_ok=True)
+        # Transactions are managed explicitly so leasing can take the write lock up front
+        self.connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        # Rollback journal, not WAL: WAL relies on shared memory, which a working
+        # folder shared between machines over a network filesystem does not provide
+        self.connection.execute('PRAGMA journal_mode=DELETE')
+
+        # Workers starting together must not each (re)create the table under the others
+        self._transaction()
+        try:
+            if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                self.connection.execute('DROP TABLE IF EXISTS jobs')
+                for statement in SCHEMA.split(';'):
+                    if statement.strip():
+                        self.connection.execute(statement)
+                self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def close(self):
+        self.connection.close()
+
+    def _transaction(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+
+    def sync(self):
+        """Bring the queue in line with the manifests and the outputs on disk"""
+        names = existing_files(self.working_folder)
+        now = time.time()
+        parts = {}
+        for manifest in list_manifests(self.working_folder):
+            for part in manifest['parts']:
+                parts[(manifest['lecture_number'], part['part_number'])] = part
+
+        self._transaction()
+        try:
+            jobs = {(row['lecture'], row['part']): row for row in self.connection.execute(
+                'SELECT lecture, part, state FROM jobs')}
+
+            for key in set(jobs) - set(parts):
+                self.connection.execute('DELETE FROM jobs WHERE lecture = ? AND part = ?', key)
+
+            for key, part in parts.items():
+                has_output = os.path.basename(part['output_file']) in names
+                job = jobs.get(key)
+                if job is None:
+                    self.connection.execute(
+                        'INSERT INTO jobs (lecture, part, segment_file, instruction_file, output_file, '
+                        'state, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        key + (part['segment_file'], part['instruction_file'], part['output_file'],
+                               DONE if has_output else PENDING, now))
+                elif has_output and job['state'] != DONE:
+                    self._set_state(key, DONE, now)
+                elif not has_output and job['state'] == DONE:
+                    # Output retired by an incremental prepare: the part needs processing again
+                    self.connection.execute(
+                        'UPDATE jobs SET state = ?, attempts = 0, error = NULL, worker = NULL, '
+                        'updated_at = ? WHERE lecture = ? AND part = ?', (PENDING, now) + key)
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def lease(self, worker: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Claim the next job for worker, or None when nothing is left"""
+        worker = worker or default_worker_id()
+        now = time.time()
+        self._transaction()
+        try:
+            # A part whose workers keep dying is not handed out forever
+            self.connection.execute(
+                'UPDATE jobs SET state = ?, error = ?, worker = NULL, lease_expires = NULL, updated_at = ? '
+                'WHERE state = ? AND lease_expires < ? AND attempts >= ?',
+                (FAILED, 'lease expired on the last attempt', now, LEASED, now, self.max_attempts))
+            row = self.connection.execute(NEXT_JOB, (now,)).fetchone()
+            if row is None:
+                self.connection.execute('COMMIT')
+                return None
+            self.connection.execute(
+                'UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, '
+                'updated_at = ? WHERE lecture = ? AND part = ?',
+                (LEASED, worker, now + self.lease_seconds, now, row['lecture'], row['part']))
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+        job = dict(row)
+        job.update(state=LEASED, worker=worker, attempts=row['attempts'] + 1)
+        return job
+
+    def renew(self, lecture: int, part: int, worker: Optional[str] = None) -> bool:
+        """Extend a lease still held by worker"""
+        cursor = self.connection.execute(
+            'UPDATE jobs SET lease_expires = ?, updated_at = ? '
+            'WHERE lecture = ? AND part = ? AND state = ? AND worker = ?',
+            (time.time() + self.lease_seconds, time.time(), lecture, part, LEASED,
+             worker or default_worker_id()))
+        return cursor.rowcount == 1
+
+    def complete(self, lecture: int, part: int, worker: Optional[str] = None) -> bool:
+        """Mark a job done if worker still holds its lease"""
+        cursor = self.connection.execute(
+            'UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, error = NULL, updated_at = ? '
+            'WHERE lecture = ? AND part = ? AND state = ? AND worker = ?',
+            (DONE, time.time(), lecture, part, LEASED, worker or default_worker_id()))
+        return cursor.rowcount == 1
+
+    def fail(self, lecture: int, part: int, error: str, worker: Optional[str] = None) -> bool:
+        """Return a job held by worker to the queue, or park it as failed after max_attempts"""
+        cursor = self.connection.execute(
+            'UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, error = ?, '
+            'worker = NULL, lease_expires = NULL, updated_at = ? '
+            'WHERE lecture = ? AND part = ? AND state = ? AND worker = ?',
+            (self.max_attempts, FAILED, PENDING, error, time.time(), lecture, part, LEASED,
+             worker or default_worker_id()))
+        return cursor.rowcount == 1
+
+    def retry_failed(self) -> int:
+        """Put every failed job back in the queue"""
+        return self.connection.execute(
+            'UPDATE jobs SET state = ?, attempts = 0, error = NULL, updated_at = ? WHERE state = ?',
+            (PENDING, time.time(), FAILED)).rowcount
+
+    def set_priority(self, lecture: int, priority: int):
+        """Jobs of higher-priority lectures are leased first"""
+        self.connection.execute('UPDATE jobs SET priority = ? WHERE lecture = ?', (priority, lecture))
+
+    def jobs(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Jobs in the order they would be leased (expired leases count as pending, or failed once out of attempts)"""
+        rows = self.connection.execute(
+            'SELECT j.*, p.progress FROM jobs j '
+            "JOIN (SELECT lecture, AVG(state = 'done') AS progress FROM jobs GROUP BY lecture) p USING (lecture) "
+            'ORDER BY j.priority DESC, p.progress DESC, j.lecture, j.part')
+        now = time.time()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            if job['state'] == LEASED and job['lease_expires'] < now:
+                # What the next lease() will make of it
+                job['state'] = FAILED if job['attempts'] >= self.max_attempts else PENDING
+            jobs.append(job)
+        return [job for job in jobs if state is None or job['state'] == state]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each state, expired leases counted as in jobs()"""
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for job in self.jobs():
+            counts[job['state']] += 1
+        return counts
+
+    def _set_state(self, key, state: str, now: float):
+        self.connection.execute(
+            'UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, error = NULL, updated_at = ? '
+            'WHERE lecture = ? AND part = ?', (state, now) + tuple(key))
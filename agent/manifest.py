@@ -0,0 +1,84 @@
+"""
+Preparation Manifest
+Per-lecture JSON record of prepared parts and their content hashes
+"""
+
+import glob
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from records import SegmentFiles, TranscriptAnalysis
+
+
+MANIFEST_VERSION = 2
+
+
+def manifest_path(working_folder: str, lecture_num: int) -> str:
+    """Path of a lecture's manifest inside the working folder"""
+    return os.path.join(working_folder, f"L{lecture_num:02d}_manifest.json")
+
+
+def load_manifest(working_folder: str, lecture_num: int) -> Optional[Dict[str, Any]]:
+    """Return the lecture's manifest, or None if missing or unreadable"""
+    try:
+        with open(manifest_path(working_folder, lecture_num), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(working_folder: str, lecture_num: int, manifest: Dict[str, Any]):
+    """Write the manifest atomically"""
+    manifest['version'] = MANIFEST_VERSION
+    path = manifest_path(working_folder, lecture_num)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def manifest_parts(manifest: Optional[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Parts of a manifest keyed by part number"""
+    if not manifest:
+        return {}
+    return {part['part_number']: part for part in manifest.get('parts', [])}
+
+
+def list_manifests(working_folder: str) -> List[Dict[str, Any]]:
+    """All readable lecture manifests in the working folder, ordered by lecture"""
+    manifests = []
+    for path in glob.glob(os.path.join(working_folder, 'L*_manifest.json')):
+        match = re.match(r'L(\d+)_manifest\.json$', os.path.basename(path))
+        if match:
+            manifest = load_manifest(working_folder, int(match.group(1)))
+            if manifest:
+                manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m['lecture_number'])
+
+
+def existing_files(working_folder: str) -> Set[str]:
+    """Names present in the working folder - one directory read instead of a stat per part"""
+    try:
+        return set(os.listdir(working_folder))
+    except OSError:
+        return set()
+
+
+def preparation_from_manifest(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the preparation dict that finalize_lecture expects"""
+    return {
+        'transcript_file': manifest['transcript_file'],
+        'lecture_number': manifest['lecture_number'],
+        'segment_files': [
+            SegmentFiles(part['part_number'], part['segment_file'], part['instruction_file'],
+                         part['output_file'], overlap=part.get('overlap', False))
+            for part in manifest['parts']
+        ],
+        'analysis': TranscriptAnalysis.from_dict(manifest.get('analysis', {}))
+    }
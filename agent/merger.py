@@ -0,0 +1,102 @@
+"""
+Merge Writer
+Streams the comprehensive document to its destination while collecting statistics
+"""
+
+from typing import Optional, TextIO, Tuple
+
+from tokenizer import DocumentScan, TIMESTAMP, header_level, scan_line
+from timestamp_index import TimestampIndex, parse_timestamp
+
+
+class MergeWriter:
+    """
+    Writes document pieces joined by newlines - the streaming equivalent of
+    "\n".join(pieces). Each piece's lines can be fed to a DocumentScan as
+    they pass, a chunk of complete lines at a time; pieces without a scan are
+    copied as they are. Nothing larger than one chunk is held in memory.
+    """
+
+    def __init__(self, destination: TextIO, chunk_size: int = 1 << 20):
+        self.destination = destination
+        self.chunk_size = chunk_size
+        self._started = False
+        self._partial = ''
+
+    def add_text(self, text: str, scan: Optional[DocumentScan] = None):
+        """Append one piece of text"""
+        self._separate()
+        self._write(text, scan)
+        self._finish_piece(scan)
+
+    def add_file(self, path: str, scan: Optional[DocumentScan] = None):
+        """Append the contents of a file, copied in chunks"""
+        self._separate()
+        with open(path, 'r', encoding='utf-8') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), ''):
+                self._write(chunk, scan)
+        self._finish_piece(scan)
+
+    def _separate(self):
+        if self._started:
+            self.destination.write('\n')
+        self._started = True
+
+    def _write(self, text: str, scan: Optional[DocumentScan]):
+        self.destination.write(text)
+        if scan is None:
+            return
+
+        # Complete lines are scanned as one block; the unfinished last line waits for the rest
+        text = self._partial + text
+        cut = text.rfind('\n')
+        if cut == -1:
+            self._partial = text
+            return
+        scan.feed_text(text[:cut])
+        self._partial = text[cut + 1:]
+
+    def _finish_piece(self, scan: Optional[DocumentScan]):
+        # The separator that follows a piece ends its last line
+        if scan is not None:
+            scan.feed(self._partial)
+        self._partial = ''
+
+
+def trim_seam(text: str, covered: TimestampIndex) -> Tuple[str, int]:
+    """
+    Drop the leading sections of a part that repeat the previous part.
+
+    The part is split into sections at header lines. Leading sections whose
+    timestamps are all covered by the previous part are dropped, together
+    with the untimed sections attached to them; the first section that
+    brings a new timestamp, and everything after it, is kept. Returns the
+    remaining text and the number of sections dropped.
+    """
+    lines = text.split('\n')
+
+    starts = [0] + [i for i, line in enumerate(lines) if i and header_level(line)]
+    bounds = list(zip(starts, starts[1:] + [len(lines)]))
+
+    keep_from = 0
+    dropped = 0
+    dropping = None  # Decision of the last timed section; None before the first one
+    for index, (first, last) in enumerate(bounds):
+        timestamps = [parse_timestamp(token.value)
+                      for i in range(first, last)
+                      for token in scan_line(lines[i], i + 1) if token.kind == TIMESTAMP]
+
+        if timestamps:
+            dropping = all(covered.covers(start, end) for start, end in timestamps)
+            if not dropping:
+                break
+        elif dropping is None:
+            # Untimed sections before the first timed one follow its decision
+            continue
+
+        keep_from = last
+        dropped = index + 1
+
+    if not dropped:
+        return text, 0
+    return '\n'.join(lines[keep_from:]), dropped
@@ -0,0 +1,236 @@
+"""
+Notes Search
+SQLite FTS5 full-text index over finalized comprehensive notes
+"""
+
+import os
+import re
+import sqlite3
+import unicodedata
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from analysis_cache import hash_file
+from tokenizer import TIMESTAMP, header_level, scan_line
+
+
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    lecture INTEGER PRIMARY KEY,
+    path TEXT,
+    content_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    lecture INTEGER,
+    line INTEGER,
+    header TEXT,
+    timestamp TEXT,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS sections_lecture ON sections (lecture);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5 (
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Harakat, superscript alef and tatweel are dropped; hamza-carrying alefs and
+# alef maqsura are folded so spelling variants find each other
+_ALEF = 'ا'
+_YA = 'ي'
+ARABIC_NORMALIZATION = {code: None for code in range(0x064B, 0x0660)}
+ARABIC_NORMALIZATION.update({
+    0x0670: None,   # superscript alef
+    0x0640: None,   # tatweel
+    0x0622: _ALEF,  # alef with madda
+    0x0623: _ALEF,  # alef with hamza above
+    0x0625: _ALEF,  # alef with hamza below
+    0x0671: _ALEF,  # alef wasla
+    0x0649: _YA,    # alef maqsura
+    0x06CC: _YA,    # farsi ya
+})
+DROPPED_CHARACTERS = {code for code, replacement in ARABIC_NORMALIZATION.items() if replacement is None}
+
+
+# Words as the unicode61 tokenizer splits them
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+SNIPPET_WORDS = 16
+
+
+def normalize_arabic(text: str) -> str:
+    """Text with Arabic spelling variants folded, as stored in and queried against the index"""
+    return text.translate(ARABIC_NORMALIZATION)
+
+
+def _fold(word: str) -> str:
+    """A normalized word as the index compares it: case and Latin diacritics ignored"""
+    decomposed = unicodedata.normalize('NFKD', word)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def make_snippet(text: str, terms: List[str], size: int = SNIPPET_WORDS) -> str:
+    """
+    About size words of the original text around the best cluster of query
+    terms, with matches in [brackets]. Words are matched on their normalized
+    form, as in the index, but shown as written.
+    """
+    normalized = normalize_arabic(text)
+    # Where each character of the normalized text sits in the original (normalization only drops or swaps characters)
+    positions = [index for index, char in enumerate(text) if ord(char) not in DROPPED_CHARACTERS]
+    positions.append(len(text))
+
+    keys = {_fold(word) for term in terms for word in WORD_PATTERN.findall(term)}
+    words = []
+    for match in WORD_PATTERN.finditer(normalized):
+        key = _fold(match.group())
+        words.append((positions[match.start()], positions[match.end()], key if key in keys else None))
+    if not words:
+        return text[:200]
+
+    # Window with the most distinct query words, opening a couple of words before a match
+    hits = [index for index, word in enumerate(words) if word[2]] or [0]
+    best_start, best_score = 0, -1
+    for hit in hits:
+        start = max(0, min(hit - 2, len(words) - size))
+        score = len({key for _, _, key in words[start:start + size] if key})
+        if score > best_score:
+            best_start, best_score = start, score
+
+    pieces = ['…'] if best_start > 0 else []
+    cursor = words[best_start][0]
+    for first, last, key in words[best_start:best_start + size]:
+        pieces.append(text[cursor:first])
+        pieces.append(f'[{text[first:last]}]' if key else text[first:last])
+        cursor = last
+    if best_start + size < len(words):
+        pieces.append('…')
+    return ''.join(pieces)
+
+
+def iter_sections(path: str) -> Iterator[Tuple[int, str, Optional[str], str]]:
+    """(line, header, timestamp, text) for every header-delimited section of a notes file"""
+    header = ''
+    timestamp = None
+    start_line = 1
+    lines = []
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if header_level(line):
+                if lines:
+                    yield start_line, header, timestamp, '\n'.join(lines)
+                header = line
+                timestamp = None
+                start_line = line_number
+                lines = []
+
+            if timestamp is None:
+                for token in scan_line(line, line_number):
+                    if token.kind == TIMESTAMP:
+                        timestamp = token.value
+                        break
+            lines.append(line)
+
+    if lines:
+        yield start_line, header, timestamp, '\n'.join(lines)
+
+
+class NotesSearch:
+    """
+    Section-level full-text search over the finished notes of every lecture.
+
+    Each header starts a new section; sections keep their header, first
+    timestamp and line so hits can be shown in context. A lecture is
+    re-indexed only when its notes file changed.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.connection = sqlite3.connect(db_path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        # Rollback journal, as for the other databases in working/ (WAL needs memory shared by every reader)
+        self.connection.execute('PRAGMA journal_mode=DELETE')
+
+        # Stages and workers opening a new index together must not each (re)create it under the others
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                for table in ('documents', 'sections', 'sections_fts'):
+                    self.connection.execute(f'DROP TABLE IF EXISTS {table}')
+                # Raises sqlite3.OperationalError when SQLite was built without FTS5
+                for statement in SCHEMA.split(';'):
+                    if statement.strip():
+                        self.connection.execute(statement)
+                self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+
+    def close(self):
+        self.connection.close()
+
+    def index_notes(self, lecture_num: int, path: str) -> int:
+        """(Re)index a lecture's notes unless unchanged; returns the number of sections indexed"""
+        content_hash = hash_file(path)
+        row = self.connection.execute('SELECT content_hash FROM documents WHERE lecture = ?',
+                                      (lecture_num,)).fetchone()
+        if row and row['content_hash'] == content_hash:
+            return 0
+
+        count = 0
+        with self.connection:
+            self._delete_lecture(lecture_num)
+            for line, header, timestamp, text in iter_sections(path):
+                # The original text is kept for snippets; the index only sees the normalized form
+                cursor = self.connection.execute(
+                    'INSERT INTO sections (lecture, line, header, timestamp, body) VALUES (?, ?, ?, ?, ?)',
+                    (lecture_num, line, header, timestamp, text))
+                self.connection.execute('INSERT INTO sections_fts (rowid, body) VALUES (?, ?)',
+                                        (cursor.lastrowid, normalize_arabic(text)))
+                count += 1
+            self.connection.execute(
+                'INSERT OR REPLACE INTO documents (lecture, path, content_hash) VALUES (?, ?, ?)',
+                (lecture_num, path, content_hash))
+
+        return count
+
+    def remove_lecture(self, lecture_num: int):
+        """Drop a lecture from the index"""
+        with self.connection:
+            self._delete_lecture(lecture_num)
+            self.connection.execute('DELETE FROM documents WHERE lecture = ?', (lecture_num,))
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Best matching sections for all words of the query, with snippets"""
+        terms = normalize_arabic(query).split()
+        if not terms:
+            return []
+
+        # Quote every term so punctuation in the query is not read as FTS syntax
+        match = ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+        results = []
+        for row in self.connection.execute(
+                'SELECT s.lecture, s.line, s.header, s.timestamp, s.body, d.path '
+                'FROM sections_fts JOIN sections s ON s.id = sections_fts.rowid '
+                'LEFT JOIN documents d ON d.lecture = s.lecture '
+                'WHERE sections_fts MATCH ? ORDER BY bm25(sections_fts) LIMIT ?',
+                (match, limit)):
+            result = dict(row)
+            result['snippet'] = make_snippet(result.pop('body'), terms)
+            results.append(result)
+        return results
+
+    def _delete_lecture(self, lecture_num: int):
+        self.connection.execute(
+            'DELETE FROM sections_fts WHERE rowid IN (SELECT id FROM sections WHERE lecture = ?)',
+            (lecture_num,))
+        self.connection.execute('DELETE FROM sections WHERE lecture = ?', (lecture_num,))
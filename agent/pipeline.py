@@ -0,0 +1,162 @@
+"""
+Lecture Pipeline
+Runs analyze, segment-write, process, merge and validate as overlapping stages across lectures
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from processor import LectureNotesAgent
+from segment_processor import SegmentProcessor
+
+
+STAGES = ('analyze', 'segment_write', 'process', 'merge', 'validate')
+
+_DONE = object()
+
+
+class LecturePipeline:
+    """
+    One thread per stage, connected by bounded queues.
+
+    Lectures flow through the stages in order, so while lecture N is being
+    processed lecture N+1 is already analyzed and written out, and lecture
+    N-1 is being merged. The bounded queues keep a fast stage from running
+    far ahead of a slow one (and holding many analyses in memory). Total
+    time tends towards that of the slowest stage rather than the sum of all
+    stages, and the first lecture is finished without waiting for the
+    others to be prepared.
+
+    SQLite connections belong to the thread that opened them, so every
+    stage thread builds its own agent from agent_options. A lecture that
+    fails in one stage skips the remaining stages and is reported with its
+    error.
+    """
+
+    def __init__(self, source_folder: str, destination_folder: str, processor: SegmentProcessor,
+                 working_folder: str = 'working', workers: int = 4, queue_size: int = 2,
+                 incremental: bool = False, agent_options: Optional[Dict[str, Any]] = None):
+        self.source_folder = source_folder
+        self.destination_folder = destination_folder
+        self.working_folder = working_folder
+        self.processor = processor
+        self.workers = workers
+        self.queue_size = max(1, queue_size)
+        self.incremental = incremental
+        self.agent_options = agent_options or {}
+
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+
+    def _agent(self) -> LectureNotesAgent:
+        return LectureNotesAgent(self.source_folder, self.destination_folder, self.working_folder,
+                                 **self.agent_options)
+
+    def run(self, transcript_files: List[str],
+            on_finished: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Push every transcript through all stages; returns one record per lecture, in order"""
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.started = time.perf_counter()
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in STAGES] + [queue.Queue()]
+        threads = [threading.Thread(target=self._stage, name=f'pipeline-{stage}',
+                                    args=(stage, queues[i], queues[i + 1]), daemon=True)
+                   for i, stage in enumerate(STAGES)]
+        for thread in threads:
+            thread.start()
+
+        # Feed from a thread of its own so a full first queue does not block collecting results
+        def feed():
+            for transcript_file in transcript_files:
+                queues[0].put({'transcript_file': transcript_file, 'error': None, 'timings': {}})
+            queues[0].put(_DONE)
+        threading.Thread(target=feed, name='pipeline-feed', daemon=True).start()
+
+        records = []
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            item['finished_at'] = time.perf_counter() - self.started
+            records.append(self._summary(item))
+            if on_finished:
+                on_finished(records[-1])
+
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return records
+
+    def _stage(self, stage: str, inbox: queue.Queue, outbox: queue.Queue):
+        agent = None
+        setup_error = None
+        step = getattr(self, f'_{stage}')
+        try:
+            try:
+                agent = self._agent()
+            except Exception as e:
+                # Keep draining the inbox so every lecture, and the end marker, still reaches the output
+                setup_error = f"{stage}: {e}"
+                print(f"  ✗ Could not start the {stage} stage: {e}")
+
+            while True:
+                item = inbox.get()
+                if item is _DONE:
+                    break
+                if item['error'] is None and setup_error:
+                    item['error'] = setup_error
+                elif item['error'] is None:
+                    start = time.perf_counter()
+                    try:
+                        step(agent, item)
+                    except Exception as e:
+                        item['error'] = f"{stage}: {e}"
+                        print(f"  ✗ {os.path.basename(item['transcript_file'])} failed in {stage}: {e}")
+                    seconds = time.perf_counter() - start
+                    item['timings'][stage] = seconds
+                    self.stage_seconds[stage] += seconds
+                outbox.put(item)
+        finally:
+            outbox.put(_DONE)
+            if agent:
+                for index in (agent.corpus_index, agent.notes_search):
+                    if index:
+                        index.close()
+
+    def _analyze(self, agent: LectureNotesAgent, item: Dict[str, Any]):
+        print(f"Preparing: {item['transcript_file']}")
+        item['analysis'], item['plan'] = agent.load_analysis(item['transcript_file'])
+
+    def _segment_write(self, agent: LectureNotesAgent, item: Dict[str, Any]):
+        item['preparation'] = agent.write_segments(item['transcript_file'], item.pop('analysis'),
+                                                   item.pop('plan'), self.incremental)
+
+    def _process(self, agent: LectureNotesAgent, item: Dict[str, Any]):
+        results = agent.process_lecture(item['preparation'], self.processor, self.workers)
+        item['processed'] = len(results)
+        failed = [result for result in results if result['error']]
+        if failed:
+            raise RuntimeError(f"{len(failed)} part(s) failed, first: {failed[0]['error']}")
+
+    def _merge(self, agent: LectureNotesAgent, item: Dict[str, Any]):
+        item['merged'] = agent.merge_lecture(item['preparation'])
+
+    def _validate(self, agent: LectureNotesAgent, item: Dict[str, Any]):
+        item['result'] = agent.validate_lecture(item['preparation'], item.pop('merged'))
+
+    @staticmethod
+    def _summary(item: Dict[str, Any]) -> Dict[str, Any]:
+        """What is kept of a finished lecture; analyses and scans are dropped"""
+        preparation = item.get('preparation') or {}
+        return {
+            'file': item['transcript_file'],
+            'lecture_num': preparation.get('lecture_number'),
+            'segments': len(preparation.get('segment_files', [])),
+            'processed': item.get('processed', 0),
+            'result': item.get('result'),
+            'error': item['error'],
+            'timings': item['timings'],
+            'finished_at': item['finished_at']
+        }
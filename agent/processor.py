@@ -3,23 +3,32 @@ Lecture Notes Processor for Claude Code
 Prepares transcripts for processing within Claude Code environment
 """
 
+import io
 import os
 import re
+import hashlib
+import sqlite3
+import time
+from array import array
+from itertools import accumulate, islice
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from formatter import FormattingRules
 from quality_checker import QualityChecker
-
-
-class ProcessingResult:
-    """Result of processing a lecture"""
-
-    def __init__(self, output_path: str, word_count: int,
-                 timestamp_coverage: float, quality_score: float):
-        self.output_path = output_path
-        self.word_count = word_count
-        self.timestamp_coverage = timestamp_coverage
-        self.quality_score = quality_score
+from tokenizer import DocumentScan
+from segmenter import SegmentationStrategy, BoundaryAwareSegmenter, BOUNDARY_STRENGTH, NO_BOUNDARY
+from analysis_cache import AnalysisCache, JsonCache, hash_file, TRANSIENT_ANALYSIS_KEYS
+from manifest import load_manifest, save_manifest, manifest_parts, existing_files
+from merger import MergeWriter, trim_seam
+from timestamp_index import TimestampIndex
+from instrumentation import Instrumentation
+from file_writer import AtomicFileWriter
+from instructions import ensure_template, instruction_fields, render_record
+from corpus_index import CorpusIndex
+from notes_search import NotesSearch
+from transcript_reader import TranscriptReader
+from segment_processor import SegmentProcessor, SegmentWorkerPool
+from records import TranscriptAnalysis, Segment, SegmentFiles, ProcessingResult
 
 
 class LectureNotesAgent:
@@ -27,16 +36,40 @@ class LectureNotesAgent:
     Prepares Arabic lecture transcripts for processing in Claude Code environment.
     """
 
-    def __init__(self, source_folder: str, destination_folder: str, working_folder: str = "working"):
+    def __init__(self, source_folder: str, destination_folder: str, working_folder: str = "working",
+                 segmenter: Optional[SegmentationStrategy] = None, use_cache: bool = True,
+                 parallel_checks: bool = False, instrumentation: Optional[Instrumentation] = None,
+                 write_workers: int = 4, index_corpus: bool = True, search_notes: bool = True):
         self.source_folder = source_folder
         self.destination_folder = destination_folder
         self.working_folder = working_folder
         self.formatting_rules = FormattingRules()
+        self.segmenter = segmenter or BoundaryAwareSegmenter()
+        self.parallel_checks = parallel_checks
+        self.instrumentation = instrumentation or Instrumentation()
+        self.write_workers = write_workers
 
         # Ensure folders exist
         os.makedirs(working_folder, exist_ok=True)
         os.makedirs(destination_folder, exist_ok=True)
 
+        self.analysis_cache = None
+        self.part_cache = None
+        if use_cache:
+            self.analysis_cache = AnalysisCache(os.path.join(working_folder, 'cache', 'analysis'))
+            self.part_cache = JsonCache(os.path.join(working_folder, 'cache', 'parts'))
+
+        # Where each hadith and chapter is taught, across every prepared lecture
+        self.corpus_index = CorpusIndex(os.path.join(working_folder, 'corpus_index.db')) if index_corpus else None
+
+        # Full-text search over finished notes; needs SQLite built with FTS5
+        self.notes_search = None
+        if search_notes:
+            try:
+                self.notes_search = NotesSearch(os.path.join(working_folder, 'notes_search.db'))
+            except sqlite3.OperationalError as e:
+                print(f"Warning: notes search disabled ({e})")
+
         # Load master prompt template
         template_path = os.path.join(os.path.dirname(__file__), 'master_prompt.txt')
         if os.path.exists(template_path):
@@ -45,357 +78,511 @@ class LectureNotesAgent:
         else:
             self.master_prompt_template = self._get_default_prompt_template()
 
-    def prepare_lecture(self, transcript_file: str) -> Dict[str, Any]:
-        """Prepare lecture for processing - creates segment files"""
+    def prepare_lecture(self, transcript_file: str, incremental: bool = False) -> Dict[str, Any]:
+        """
+        Prepare lecture for processing - creates segment files.
+
+        In incremental mode only parts whose content changed since the last
+        preparation are rewritten; the returned 'reprocess_parts' lists the
+        parts that need (re)processing.
+        """
         print(f"Preparing: {transcript_file}")
+        lecture_num = self._extract_lecture_number(os.path.basename(transcript_file))
 
-        # Phase 1: Analysis
-        print("  Phase 1: Analyzing transcript...")
-        analysis = self.analyze_transcript(transcript_file)
+        with self.instrumentation.phase('prepare', lecture=lecture_num) as record:
+            # Phases 1-2: Analysis and planning, served from the cache for unchanged transcripts
+            analysis, plan = self.load_analysis(transcript_file)
 
-        # Phase 2: Planning
-        print("  Phase 2: Creating segmentation plan...")
-        plan = self.create_segmentation_plan(analysis)
+            # Phase 3: Create segment files
+            preparation = self.write_segments(transcript_file, analysis, plan, incremental)
+
+            record['bytes_read'] = analysis.byte_count
+            record['segments'] = len(preparation['segment_files'])
+            record['changed_segments'] = len(preparation['reprocess_parts'])
+
+        return preparation
 
-        # Phase 3: Create segment files
+    def write_segments(self, transcript_file: str, analysis: TranscriptAnalysis, plan: List[Segment],
+                       incremental: bool = False) -> Dict[str, Any]:
+        """Write the segment files of an analyzed transcript and describe the preparation"""
         print("  Phase 3: Creating segment files...")
-        segment_files = self.create_segment_files(transcript_file, plan, analysis)
+        segment_files = self.create_segment_files(transcript_file, plan, analysis, incremental)
 
         return {
             'transcript_file': transcript_file,
             'analysis': analysis,
             'plan': plan,
             'segment_files': segment_files,
+            'reprocess_parts': [info['part_number'] for info in segment_files if info['changed']],
             'lecture_number': self._extract_lecture_number(os.path.basename(transcript_file))
         }
 
-    def analyze_transcript(self, file: str) -> Dict[str, Any]:
-        """Extract structure and metadata"""
-        with open(file, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        analysis = {
-            'filename': os.path.basename(file),
-            'line_count': len(content.split('\n')),
-            'char_count': len(content),
-            'duration': self._extract_duration(content),
-            'chapters': self._identify_chapters(content),
-            'hadith_numbers': self._identify_hadith(content),
-            'timestamp_ranges': self._map_timestamps(content),
-            'content': content
-        }
+    def load_analysis(self, transcript_file: str) -> Tuple[TranscriptAnalysis, List[Segment]]:
+        """Return (analysis, plan), reusing the cached result when the content is unchanged"""
+        lecture_num = self._extract_lecture_number(os.path.basename(transcript_file))
+        with self.instrumentation.phase('hash', lecture=lecture_num) as record:
+            content_hash = hash_file(transcript_file)
+            record['bytes_read'] = os.path.getsize(transcript_file)
+
+        cache_key = None
+        if self.analysis_cache:
+            cache_key = self.analysis_cache.key(content_hash, self.segmenter.describe())
+            cached = self.analysis_cache.get(cache_key)
+            if cached:
+                print("  Phase 1-2: Unchanged transcript, using cached analysis and plan")
+                self.instrumentation.emit({'event': 'cache_hit', 'name': 'analysis', 'lecture': lecture_num,
+                                           'segments': len(cached['plan'])})
+                analysis = TranscriptAnalysis.from_dict(cached['analysis'])
+                analysis.filename = os.path.basename(transcript_file)
+                analysis.source_file = transcript_file
+                analysis.content_hash = content_hash
+                return analysis, [Segment.from_dict(segment) for segment in cached['plan']]
 
-        return analysis
+        # Phase 1: Analysis
+        print("  Phase 1: Analyzing transcript...")
+        with self.instrumentation.phase('analyze', lecture=lecture_num) as record:
+            analysis = self.analyze_transcript(transcript_file)
+            record['bytes_read'] = analysis.byte_count
+            record['lines'] = analysis.line_count
+        analysis.content_hash = content_hash
 
-    def create_segmentation_plan(self, analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Divide into optimal processing segments"""
-        content = analysis['content']
-        lines = content.split('\n')
+        # Phase 2: Planning
+        print("  Phase 2: Creating segmentation plan...")
+        with self.instrumentation.phase('plan', lecture=lecture_num) as record:
+            plan = self.create_segmentation_plan(analysis)
+            record['segments'] = len(plan)
+
+        if cache_key:
+            self.analysis_cache.put(cache_key, analysis, plan)
+
+        return analysis, plan
+
+    def analyze_transcript(self, file: str) -> TranscriptAnalysis:
+        """Extract structure and metadata in a single streaming pass"""
+        scan = DocumentScan()
+        char_count = 0
+        ends_with_newline = True
+
+        # Per-line tables for the segmenter: byte offset, token estimate, boundary strength
+        line_offsets = array('Q', [0])
+        line_tokens = array('I')
+        line_boundaries = array('B')
+
+        # Walk the mapped file in chunks of whole lines: the patterns and the token
+        # estimator run over a chunk at a time, and memory stays at one chunk
+        with TranscriptReader(file) as reader:
+            byte_count = len(reader)
+            for start, end in reader.iter_chunk_ranges():
+                raw = reader.bytes(start, end)
+                ends_with_newline = raw.endswith(b'\n')
+                byte_lines = raw.split(b'\n')
+                if ends_with_newline:
+                    byte_lines.pop()
+
+                # Offset after each line's break: running sum of (length + 1), all in C
+                line_offsets.extend(islice(accumulate(map((1).__add__, map(len, byte_lines)), initial=start),
+                                           1, None))
+                if not ends_with_newline:
+                    line_offsets[-1] = end
+
+                text = raw.decode('utf-8')
+                if ends_with_newline:
+                    text = text[:-1]
+                if '\r' in text:
+                    # A line ends before its carriage return, as in TranscriptReader.iter_line_ranges
+                    text = '\n'.join(line[:-1] if line.endswith('\r') else line for line in text.split('\n'))
+                char_count += len(text) + ends_with_newline
+
+                first_line = scan.line_count + 1
+                boundaries = bytearray(len(byte_lines))
+                for token in scan.feed_text(text):
+                    strength = BOUNDARY_STRENGTH.get(token.kind, NO_BOUNDARY)
+                    if strength > boundaries[token.line - first_line]:
+                        boundaries[token.line - first_line] = strength
+                line_boundaries.frombytes(boundaries)
+                line_tokens.extend(self.segmenter.estimate_line_tokens(text))
+
+        # Match str.split('\n') semantics: a trailing newline starts one more (empty) line
+        line_count = scan.line_count + 1 if ends_with_newline else scan.line_count
+
+        return TranscriptAnalysis(
+            filename=os.path.basename(file),
+            source_file=file,
+            line_count=line_count,
+            char_count=char_count,
+            byte_count=byte_count,
+            duration=scan.last_time or "Unknown",
+            chapters=scan.chapters,
+            hadith_numbers=sorted(set(scan.hadith_numbers)),
+            timestamp_ranges=scan.timestamps,
+            line_offsets=line_offsets,
+            line_tokens=line_tokens,
+            line_boundaries=line_boundaries
+        )
 
-        # Split by character count for manageable segments
-        max_chars_per_segment = 15000  # ~15k characters per segment
+    def create_segmentation_plan(self, analysis: TranscriptAnalysis) -> List[Segment]:
+        """Divide into processing segments, preferring chapter/hadith/timestamp boundaries"""
+        return self.segmenter.plan(analysis)
 
-        segments = []
-        current_segment_lines = []
-        current_char_count = 0
+    def create_segment_files(self, transcript_file: str, plan: List[Segment],
+                           analysis: TranscriptAnalysis, incremental: bool = False) -> List[SegmentFiles]:
+        """
+        Create work files for each segment and record their hashes in the manifest.
 
-        for line in lines:
-            line_length = len(line) + 1  # +1 for newline
+        With incremental=True, segments whose content hash matches the manifest
+        are left untouched (including their _output.md). Outputs of changed or
+        dropped parts are moved aside as *_output.stale.md so they show up as
+        pending again.
 
-            if current_char_count + line_length > max_chars_per_segment and current_segment_lines:
-                # Save current segment
-                segment_content = '\n'.join(current_segment_lines)
-                segments.append({
-                    'part_number': len(segments) + 1,
-                    'content': segment_content,
-                    'line_count': len(current_segment_lines)
-                })
-                current_segment_lines = []
-                current_char_count = 0
-
-            current_segment_lines.append(line)
-            current_char_count += line_length
-
-        # Add final segment
-        if current_segment_lines:
-            segment_content = '\n'.join(current_segment_lines)
-            segments.append({
-                'part_number': len(segments) + 1,
-                'content': segment_content,
-                'line_count': len(current_segment_lines)
-            })
-
-        # If only one small segment, keep it
-        if not segments:
-            segments.append({
-                'part_number': 1,
-                'content': content,
-                'line_count': len(lines)
-            })
-
-        return segments
-
-    def create_segment_files(self, transcript_file: str, plan: List[Dict[str, Any]],
-                           analysis: Dict[str, Any]) -> List[str]:
-        """Create work files for each segment"""
+        Files are written by a background AtomicFileWriter: each appears under
+        its final name only once complete, instructions before segment, and
+        the manifest is saved after every write has landed.
+        """
         filename = os.path.basename(transcript_file)
         lecture_num = self._extract_lecture_number(filename)
+        previous_parts = manifest_parts(load_manifest(self.working_folder, lecture_num)) if incremental else {}
+        total_parts = len(plan)
+
+        # One directory read instead of two stats per part; also clears segment and instruction
+        # writes cut short by a crash (output .tmp files may belong to a worker still writing them)
+        names = existing_files(self.working_folder)
+        stray = ('_segment.txt.tmp', '_instructions.md.tmp')
+        for name in names:
+            if name.startswith(f"L{lecture_num:02d}_PART") and name.endswith(stray):
+                try:
+                    os.remove(os.path.join(self.working_folder, name))
+                except OSError:
+                    pass
+
+        # The full instructions are shared by every part and written only when they change
+        ensure_template(self.working_folder)
 
         segment_files = []
+        manifest_entries = []
+
+        with self.instrumentation.phase('write_segments', lecture=lecture_num) as phase_record, \
+                TranscriptReader(transcript_file) as source, \
+                AtomicFileWriter(self.write_workers) as writer:
+            phase_record.update(bytes_read=0, bytes_written=0, segments=total_parts, changed_segments=0)
+            for segment in plan:
+                part_num = segment.part_number
+                prefix = f"L{lecture_num:02d}_PART{part_num}"
+                segment_path = os.path.join(self.working_folder, f"{prefix}_segment.txt")
+                instruction_path = os.path.join(self.working_folder, f"{prefix}_instructions.md")
+                output_path = os.path.join(self.working_folder, f"{prefix}_output.md")
+
+                with self.instrumentation.phase('segment_write', event='segment', lecture=lecture_num,
+                                                part=part_num) as record:
+                    # With overlap, the written segment includes its context window
+                    start_offset = segment.context_start_offset
+                    end_offset = segment.context_end_offset
+                    # Parts that open with context repeat the previous part; the merge trims that seam
+                    overlap = segment.overlap
+
+                    # Hash straight from the mapping; only changed segments are copied out
+                    segment_size = end_offset - start_offset
+                    with source.view(start_offset, end_offset) as segment_view:
+                        segment_hash = hashlib.sha256(segment_view).hexdigest()
+
+                    instruction_content = self._create_segment_instructions(
+                        segment, part_num, total_parts, lecture_num
+                    )
+                    instruction_bytes = instruction_content.encode('utf-8')
+                    instruction_hash = hashlib.sha256(instruction_bytes).hexdigest()
+
+                    previous = previous_parts.get(part_num, {})
+                    changed = not (previous.get('segment_hash') == segment_hash
+                                   and os.path.basename(segment_path) in names)
+
+                    # Instructions land first: a segment file on disk always has its instructions
+                    files = []
+                    if changed or previous.get('instructions_hash') != instruction_hash \
+                            or os.path.basename(instruction_path) not in names:
+                        files.append((instruction_path, instruction_bytes))
+                    if changed:
+                        files.append((segment_path, source.bytes(start_offset, end_offset)))
+                        if incremental:
+                            self._retire_output(output_path)
+
+                    bytes_written = sum(len(data) for _, data in files)
+                    if files:
+                        writer.write(*files)
+
+                    record.update(bytes_read=segment_size, bytes_written=bytes_written, changed=changed)
+
+                phase_record['bytes_read'] += segment_size
+                phase_record['bytes_written'] += bytes_written
+                phase_record['changed_segments'] += changed
+
+                segment_files.append(SegmentFiles(part_num, segment_path, instruction_path, output_path,
+                                                  changed=changed, overlap=overlap))
+                manifest_entries.append({
+                    'part_number': part_num,
+                    'segment_file': segment_path,
+                    'instruction_file': instruction_path,
+                    'output_file': output_path,
+                    'segment_hash': segment_hash,
+                    'instructions_hash': instruction_hash,
+                    'overlap': overlap
+                })
 
-        for segment in plan:
-            part_num = segment['part_number']
-            total_parts = len(plan)
-
-            # Create segment file
-            segment_filename = f"L{lecture_num:02d}_PART{part_num}_segment.txt"
-            segment_path = os.path.join(self.working_folder, segment_filename)
-
-            with open(segment_path, 'w', encoding='utf-8') as f:
-                f.write(segment['content'])
-
-            # Create instruction file
-            instruction_filename = f"L{lecture_num:02d}_PART{part_num}_instructions.md"
-            instruction_path = os.path.join(self.working_folder, instruction_filename)
+                status = "Created" if changed else "Unchanged"
+                print(f"    {status} part {part_num}/{total_parts}: {prefix}_segment.txt")
 
-            instruction_content = self._create_segment_instructions(
-                segment, part_num, total_parts, lecture_num
-            )
+            writer.flush()
 
-            with open(instruction_path, 'w', encoding='utf-8') as f:
-                f.write(instruction_content)
+        # Parts that no longer exist after the transcript got shorter
+        for part_num in sorted(set(previous_parts) - {segment.part_number for segment in plan}):
+            prefix = os.path.join(self.working_folder, f"L{lecture_num:02d}_PART{part_num}")
+            for suffix in ('_segment.txt', '_instructions.md'):
+                if os.path.exists(prefix + suffix):
+                    os.remove(prefix + suffix)
+            self._retire_output(f"{prefix}_output.md")
+            print(f"    Removed obsolete part {part_num}")
 
-            segment_files.append({
-                'part_number': part_num,
-                'segment_file': segment_path,
-                'instruction_file': instruction_path,
-                'output_file': os.path.join(self.working_folder,
-                                           f"L{lecture_num:02d}_PART{part_num}_output.md")
-            })
+        save_manifest(self.working_folder, lecture_num, {
+            'lecture_number': lecture_num,
+            'transcript_file': transcript_file,
+            'source_hash': analysis.content_hash,
+            'analysis': analysis.to_dict(exclude=TRANSIENT_ANALYSIS_KEYS),
+            'parts': manifest_entries
+        })
 
-            print(f"    Created part {part_num}/{total_parts}: {segment_filename}")
+        if self.corpus_index:
+            with self.instrumentation.phase('index', lecture=lecture_num) as record:
+                record['segments'] = self.corpus_index.update_lecture(
+                    lecture_num, transcript_file, analysis.content_hash, plan,
+                    {entry['part_number']: entry['segment_hash'] for entry in manifest_entries})
 
         return segment_files
 
-    def _create_segment_instructions(self, segment: Dict[str, Any],
+    def _retire_output(self, output_path: str):
+        """Move a no longer valid part output aside so the part counts as pending"""
+        if os.path.exists(output_path):
+            os.replace(output_path, output_path[:-len('.md')] + '.stale.md')
+
+    def _create_segment_instructions(self, segment: Segment,
                                     part_number: int, total_parts: int,
                                     lecture_num: int) -> str:
-        """Create instruction file for segment processing"""
-
-        return f"""# Processing Instructions for Lecture {lecture_num:02d} - Part {part_number}/{total_parts}
-
-## Task
-Convert this Arabic lecture transcript segment into comprehensive, professionally formatted notes.
-
-## Input File
-`L{lecture_num:02d}_PART{part_number}_segment.txt`
-
-## Output File
-`L{lecture_num:02d}_PART{part_number}_output.md`
-
-## Formatting Rules
-
-### 1. Headers (Bilingual)
-- `# Arabic Title | English Title` (Book level)
-- `## Arabic | English` (Chapter/Major section)
-- `### Arabic | English` (Subsection)
-
-### 2. Timestamps
-- `(MM:SS-MM:SS)` for ranges
-- `(MM:SS)` for single points
-- Every timestamp from source MUST appear in output
-- Place timestamp immediately after section header
-
-### 3. Text Formatting
-- **Hadith text**: Full Arabic, then full English in bold
-- **Sheikh explanations**: Arabic paragraph, then English translation
-- **Student interactions**: Mark with `[Student question]` or `[Student comment]`
+        """Per-part instruction record pointing at the shared template"""
 
-### 4. Content Capture Rules
-- **Zero additions**: Add NO content not in source
-- **Complete capture**: Miss NO content from source
-- **Preserve tone**: Maintain sheikh's rhetorical style
-- **Include everything**: Main teaching, digressions, side comments, questions, answers
+        return render_record(instruction_fields(lecture_num, part_number, total_parts, segment.overlap))
 
-### 5. Example Format
-
-```markdown
-## الحديث الأول | Hadith 1
-(0:45-5:00)
-
-### الإسناد | Chain of Narration
-
-حَدَّثَنَا الْحُمَيْدِيُّ...
-
-Al-Humaidi narrated to us...
-
-### المتن | Text
-
-إِنَّمَا الأَعْمَالُ بِالنِّيَّاتِ
-
-**"Actions are but by intentions"**
-
-### شرح الشيخ | Sheikh's Explanation
-(4:00-4:45)
-
-هذا الحديث العظيم...
-
-This great hadith...
-
-**[Student question]** (5:00):
-ما معنى النية؟
-What is the meaning of intention?
-
-**Sheikh's answer** (5:15):
-النية محلها القلب...
-The intention is in the heart...
-```
-
-## Instructions
-
-1. Read the segment file: `L{lecture_num:02d}_PART{part_number}_segment.txt`
-2. Process ALL content following the formatting rules above
-3. Preserve all Arabic text exactly as written
-4. Provide English translations for all Arabic content
-5. Use bilingual headers throughout
-6. Include all timestamps
-7. Capture every detail from the transcript
-8. Write output to: `L{lecture_num:02d}_PART{part_number}_output.md`
+    def process_lecture(self, preparation: Dict[str, Any], processor: SegmentProcessor,
+                        workers: int = 4) -> List[Dict[str, Any]]:
+        """Run every part that has no output yet through a processing backend"""
+        lecture_num = preparation['lecture_number']
+        names = existing_files(self.working_folder)
+        pending = [{
+            'lecture_num': lecture_num,
+            'part_num': info['part_number'],
+            'segment_file': info['segment_file'],
+            'instruction_file': info['instruction_file'],
+            'output_file': info['output_file']
+        } for info in preparation['segment_files'] if os.path.basename(info['output_file']) not in names]
+
+        print(f"  Processing {len(pending)}/{len(preparation['segment_files'])} parts "
+              f"with {processor.describe()}...")
+        with self.instrumentation.phase('process', lecture=lecture_num, segments=len(pending)) as record:
+            results = SegmentWorkerPool(processor, workers, self.instrumentation).process_all(pending)
+            record['bytes_read'] = sum(result.get('bytes_read', 0) for result in results)
+            record['bytes_written'] = sum(result.get('bytes_written', 0) for result in results)
+            record['failed'] = sum(1 for result in results if result['error'])
+
+        return results
+
+    def run_lecture(self, transcript_file: str, processor: SegmentProcessor, workers: int = 4,
+                    incremental: bool = False) -> Dict[str, Any]:
+        """
+        Prepare, process and finalize one lecture in a single pass.
+
+        Returns the ProcessingResult (None when a part failed and the lecture
+        was left unfinalized) with wall-clock seconds per stage.
+        """
+        timings = {}
+
+        start = time.perf_counter()
+        preparation = self.prepare_lecture(transcript_file, incremental=incremental)
+        timings['prepare'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = self.process_lecture(preparation, processor, workers)
+        timings['process'] = time.perf_counter() - start
+
+        failed = [result for result in results if result['error']]
+        result = None
+        start = time.perf_counter()
+        if failed:
+            print(f"  ✗ {len(failed)} part(s) failed; lecture {preparation['lecture_number']:02d} not finalized")
+        else:
+            result = self.finalize_lecture(preparation)
+        timings['finalize'] = time.perf_counter() - start
 
-## Critical Reminders
-- Never skip timestamps
-- Never add content not in source
-- Always provide translations
-- Maintain proper hierarchy
-- Preserve Arabic exactly
-- Include everything (digressions, Q&A, side comments)
-"""
+        return {
+            'lecture_number': preparation['lecture_number'],
+            'result': result,
+            'parts': len(preparation['segment_files']),
+            'processed': len(results) - len(failed),
+            'failed': len(failed),
+            'bytes': preparation['analysis'].byte_count or os.path.getsize(transcript_file),
+            'timings': timings
+        }
 
-    def merge_parts(self, segment_files: List[Dict[str, Any]], analysis: Dict[str, Any],
+    def merge_parts(self, segment_files: List[SegmentFiles], analysis: TranscriptAnalysis,
                    lecture_num: int) -> str:
         """Combine all processed parts into comprehensive document"""
+        buffer = io.StringIO()
+        writer = MergeWriter(buffer)
+        self.write_merged(writer, segment_files, lecture_num)
+        return buffer.getvalue()
+
+    def write_merged(self, writer: MergeWriter, segment_files: List[SegmentFiles], lecture_num: int,
+                     quality_checker: Optional[QualityChecker] = None) -> DocumentScan:
+        """
+        Stream all processed parts, in order, through a MergeWriter and return
+        the scan of the whole document. Parts whose output the quality checker
+        has already scanned are copied without being tokenized again.
+
+        Parts prepared with overlapping context start by repeating the end of
+        the previous part; those sections are dropped at the seam when the
+        previous part's timestamps already cover them.
+        """
 
         print(f"Merging {len(segment_files)} parts...")
 
-        comprehensive = []
+        scan = DocumentScan()
 
         # Title and metadata
-        comprehensive.append("# صحيح البخاري | Ṣaḥīḥ Al-Bukhārī")
-        comprehensive.append(f"# Comprehensive Lecture Notes - Lecture {lecture_num:02d}")
-        comprehensive.append("")
-        comprehensive.append("---")
-        comprehensive.append("")
+        writer.add_text("# صحيح البخاري | Ṣaḥīḥ Al-Bukhārī", scan)
+        writer.add_text(f"# Comprehensive Lecture Notes - Lecture {lecture_num:02d}", scan)
+        writer.add_text("", scan)
+        writer.add_text("---", scan)
+        writer.add_text("", scan)
 
         # Merge parts sequentially
+        previous_scan = None
         for i, segment_info in enumerate(segment_files):
             output_file = segment_info['output_file']
 
             if not os.path.exists(output_file):
                 print(f"  Warning: Output file not found: {output_file}")
-                comprehensive.append(f"\n\n**[Part {segment_info['part_number']} - Not yet processed]**\n\n")
+                writer.add_text(f"\n\n**[Part {segment_info['part_number']} - Not yet processed]**\n\n", scan)
+                previous_scan = None
                 continue
 
-            with open(output_file, 'r', encoding='utf-8') as f:
-                part_content = f.read()
-
             if i > 0:
-                comprehensive.append("")
-                comprehensive.append("---")
-                comprehensive.append("")
-
-            comprehensive.append(part_content)
-            print(f"  Merged part {segment_info['part_number']}")
-
-        return "\n".join(comprehensive)
+                writer.add_text("", scan)
+                writer.add_text("---", scan)
+                writer.add_text("", scan)
+
+            dropped = 0
+            if segment_info.get('overlap') and previous_scan is not None:
+                with open(output_file, 'r', encoding='utf-8') as f:
+                    text, dropped = trim_seam(f.read(), TimestampIndex(previous_scan.timestamps))
+
+            digest = hash_file(output_file) if quality_checker and not dropped else None
+            part_scan = quality_checker.cached_part_scan(digest) if digest else None
+
+            if dropped:
+                part_scan = DocumentScan()
+                writer.add_text(text, part_scan)
+                print(f"  Merged part {segment_info['part_number']} "
+                      f"({dropped} repeated sections dropped at the seam)")
+            elif part_scan is None:
+                part_scan = DocumentScan()
+                writer.add_file(output_file, part_scan)
+                if quality_checker:
+                    quality_checker.remember_part_scan(digest, part_scan)
+                print(f"  Merged part {segment_info['part_number']}")
+            else:
+                writer.add_file(output_file)
+                print(f"  Merged part {segment_info['part_number']} (unchanged, checked before)")
+
+            # Seams are covered because the checks run over the combined scan
+            scan.extend(part_scan)
+            previous_scan = part_scan
+
+        return scan
 
     def finalize_lecture(self, preparation: Dict[str, Any]) -> ProcessingResult:
         """Finalize and validate the comprehensive notes"""
 
+        lecture_num = preparation['lecture_number']
+        with self.instrumentation.phase('finalize', lecture=lecture_num, segments=len(preparation['segment_files'])):
+            return self.validate_lecture(preparation, self.merge_lecture(preparation))
+
+    def merge_lecture(self, preparation: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge the processed parts into the comprehensive notes; returns what validation needs"""
         lecture_num = preparation['lecture_number']
         segment_files = preparation['segment_files']
         analysis = preparation['analysis']
 
         print(f"\nFinalizing Lecture {lecture_num:02d}...")
 
-        # Merge all parts
-        comprehensive = self.merge_parts(segment_files, analysis, lecture_num)
-
-        # Quality check
-        print("  Running quality checks...")
-        quality_checker = QualityChecker(preparation['transcript_file'])
-        try:
-            validated = quality_checker.validate(comprehensive)
-            quality_score = 100.0
-            print("  ✓ Quality checks passed")
-        except Exception as e:
-            print(f"  ⚠ Quality check warnings: {e}")
-            validated = comprehensive
-            quality_score = 70.0
-
-        # Write final output
         output_filename = f"lecture_notes_L{lecture_num:02d}_COMPREHENSIVE.md"
         output_path = os.path.join(self.destination_folder, output_filename)
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(validated)
+        quality_checker = QualityChecker(preparation['transcript_file'],
+                                         source_timestamps=analysis.timestamp_ranges,
+                                         part_cache=self.part_cache,
+                                         parallel=self.parallel_checks)
+
+        # Merge all parts straight into the destination, scanning changed parts on the way
+        tmp_path = f"{output_path}.tmp"
+        with self.instrumentation.phase('merge', lecture=lecture_num, segments=len(segment_files)) as record:
+            with open(tmp_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                scan = self.write_merged(MergeWriter(f), segment_files, lecture_num, quality_checker)
+            os.replace(tmp_path, output_path)
+            record['bytes_read'] = sum(os.path.getsize(info['output_file']) for info in segment_files
+                                       if os.path.exists(info['output_file']))
+            record['bytes_written'] = os.path.getsize(output_path)
+            record['lines'] = scan.line_count
+
+        return {'output_path': output_path, 'scan': scan, 'quality_checker': quality_checker}
+
+    def validate_lecture(self, preparation: Dict[str, Any], merged: Dict[str, Any]) -> ProcessingResult:
+        """Quality-check merged notes, record them in the indexes and report"""
+        lecture_num = preparation['lecture_number']
+        output_path = merged['output_path']
+        scan = merged['scan']
+
+        # Quality check runs on the scan collected while merging
+        print("  Running quality checks...")
+        with self.instrumentation.phase('validate', lecture=lecture_num) as record:
+            try:
+                merged['quality_checker'].validate(scan)
+                quality_score = 100.0
+                print("  ✓ Quality checks passed")
+            except Exception as e:
+                print(f"  ⚠ Quality check warnings: {e}")
+                quality_score = 70.0
+            record['passed'] = quality_score == 100.0
 
         # Calculate statistics
-        word_count = len(validated.split())
-        timestamp_coverage = self._calculate_timestamp_coverage(validated, analysis)
+        word_count = scan.word_count
+        timestamp_coverage = self._calculate_timestamp_coverage(scan, merged['quality_checker'])
 
         result = ProcessingResult(
             output_path=output_path,
             word_count=word_count,
             timestamp_coverage=timestamp_coverage,
-            quality_score=quality_score
+            quality_score=quality_score,
+            lecture_number=lecture_num,
+            part_count=len(preparation['segment_files'])
         )
 
+        if self.corpus_index:
+            self.corpus_index.mark_finalized(lecture_num, output_path)
+
+        if self.notes_search:
+            with self.instrumentation.phase('search_index', lecture=lecture_num) as record:
+                record['sections'] = self.notes_search.index_notes(lecture_num, output_path)
+
         print(f"\n✓ Completed: {output_path}")
         print(f"  Words: {word_count}, Coverage: {timestamp_coverage:.1f}%, Quality: {quality_score:.1f}")
 
         return result
 
-    def _extract_duration(self, content: str) -> str:
-        """Extract total duration from timestamps"""
-        timestamps = re.findall(r'(\d{1,2}:\d{2}(?::\d{2})?)', content)
-        if timestamps:
-            return timestamps[-1]
-        return "Unknown"
-
-    def _identify_chapters(self, content: str) -> List[str]:
-        """Identify chapter markers"""
-        patterns = [
-            r'كتاب\s+[\u0600-\u06FF\s]+',
-            r'باب\s+[\u0600-\u06FF\s]+',
-        ]
-
-        chapters = []
-        for pattern in patterns:
-            matches = re.findall(pattern, content)
-            chapters.extend(matches)
-
-        return chapters
-
-    def _identify_hadith(self, content: str) -> List[int]:
-        """Identify hadith numbers"""
-        patterns = [
-            r'(?:الحديث|حديث)\s+(?:رقم\s+)?(\d+)',
-            r'Hadith\s+(?:number\s+)?(\d+)',
-        ]
-
-        hadith_numbers = set()
-        for pattern in patterns:
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            hadith_numbers.update(int(m) for m in matches)
-
-        return sorted(list(hadith_numbers))
-
-    def _map_timestamps(self, content: str) -> List[str]:
-        """Extract all timestamps"""
-        pattern = r'\((\d{1,2}:\d{2}(?::\d{2})?(?:-\d{1,2}:\d{2}(?::\d{2})?)?)\)'
-        timestamps = re.findall(pattern, content)
-        return timestamps
-
     def _extract_lecture_number(self, filename: str) -> int:
         """Extract lecture number from filename"""
         matches = re.findall(r'(\d+)', filename)
@@ -403,17 +590,17 @@ The intention is in the heart...
             return int(matches[0])
         return 1
 
-    def _calculate_timestamp_coverage(self, document: str, analysis: Dict[str, Any]) -> float:
-        """Calculate what percentage of source timestamps appear in output"""
-        source_timestamps = set(analysis['timestamp_ranges'])
-
-        output_pattern = r'\((\d{1,2}:\d{2}(?::\d{2})?(?:-\d{1,2}:\d{2}(?::\d{2})?)?)\)'
-        output_timestamps = set(re.findall(output_pattern, document))
+    def _calculate_timestamp_coverage(self, document, quality_checker: QualityChecker) -> float:
+        """Calculate what percentage of source timestamps the output covers"""
+        # Reuse the indexes the quality checks already built for this document
+        source_index = quality_checker.source_index()
+        output_index = quality_checker.output_index(document)
 
-        if not source_timestamps:
+        if not len(source_index):
             return 100.0
 
-        coverage = len(output_timestamps & source_timestamps) / len(source_timestamps) * 100
+        missing = output_index.uncovered(source_index)
+        coverage = (len(source_index) - len(missing)) / len(source_index) * 100
         return coverage
 
     def _get_default_prompt_template(self) -> str:
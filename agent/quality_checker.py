@@ -4,7 +4,20 @@ Validates output quality against strict rules
 """
 
 import re
-from typing import List, Dict, Any, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from tokenizer import DocumentScan
+from transcript_reader import TranscriptReader
+from timestamp_index import TimestampIndex, parse_timestamp
+
+
+# Bump when the cached part scan format changes
+PART_SCAN_VERSION = '2'
+
+
+BILINGUAL_HEADER_PATTERN = re.compile(r'#{1,4}\s+.+\s+\|\s+.+$')
+SECTION_HEADER_PATTERN = re.compile(r'##+ .+ \| .+$')
 
 
 class ValidationError(Exception):
@@ -15,14 +28,58 @@ class ValidationError(Exception):
 class QualityChecker:
     """Validates output quality against strict rules"""
 
-    def __init__(self, source_file=None):
+    def __init__(self, source_file=None, source_timestamps=None, part_cache=None,
+                 parallel=False, max_workers=None):
         self.source_file = source_file
-        self.source = None
-        if source_file:
-            with open(source_file, 'r', encoding='utf-8') as f:
-                self.source = f.read()
+        # JsonCache of part scans keyed by part output hash
+        self.part_cache = part_cache
+        # Run the independent checks concurrently in validate()
+        self.parallel = parallel
+        self.max_workers = max_workers
+        # Timestamps already known from the analysis spare reading the source at all
+        self.source_timestamps = source_timestamps
         self.errors = []
         self.warnings = []
+        self._document = None
+        self._document_scan = None
+        self._output_index = (None, None)
+        self._source_index = None
+        # Per-thread error/warning lists while a check runs inside validate()
+        self._check_log = threading.local()
+
+    def scan_document(self, document) -> DocumentScan:
+        """Tokenize a document once; repeated calls with the same document reuse the scan"""
+        if isinstance(document, DocumentScan):
+            return document
+        if document is not self._document:
+            self._document = document
+            self._document_scan = DocumentScan.from_text(document)
+        return self._document_scan
+
+    def output_index(self, document) -> TimestampIndex:
+        """Timestamp index of a document, built once per scan"""
+        scan = self.scan_document(document)
+        if self._output_index[0] is not scan:
+            self._output_index = (scan, TimestampIndex(scan.timestamps))
+        return self._output_index[1]
+
+    def source_index(self) -> TimestampIndex:
+        """Timestamp index of the distinct source timestamps"""
+        if self._source_index is None:
+            self._source_index = TimestampIndex(dict.fromkeys(self.extract_source_timestamps()))
+        return self._source_index
+
+    def cached_part_scan(self, digest: str) -> Optional[DocumentScan]:
+        """Scan of a part output checked before, looked up by the output's content hash"""
+        if not self.part_cache:
+            return None
+        entry = self.part_cache.get(self.part_cache.key(digest, PART_SCAN_VERSION))
+        return DocumentScan.from_dict(entry) if entry else None
+
+    def remember_part_scan(self, digest: str, scan: DocumentScan):
+        """Cache a part's scan so unchanged parts are not re-tokenized next time"""
+        if self.part_cache:
+            self.part_cache.put_entry(self.part_cache.key(digest, PART_SCAN_VERSION), scan.to_dict())
 
     def validate(self, document: str) -> bool:
         """Run all validation checks"""
@@ -38,14 +95,23 @@ class QualityChecker:
             ('Formatting Consistency', self.check_formatting_consistency)
         ]
 
+        # Shared state is prepared up front; checks then only read it
+        scan = self.scan_document(document)
+        self.output_index(scan)
+        self.source_index()
+
+        if self.parallel:
+            with ThreadPoolExecutor(max_workers=self.max_workers or len(checks)) as pool:
+                outcomes = list(pool.map(lambda item: self._run_check(item[0], item[1], scan), checks))
+        else:
+            outcomes = [self._run_check(name, check, scan) for name, check in checks]
+
+        # Merge each check's messages in check order, whatever order they finished in
         results = []
-        for name, check in checks:
-            try:
-                result = check(document)
-                results.append((name, result))
-            except Exception as e:
-                self.log_error(f"{name} check failed: {str(e)}")
-                results.append((name, False))
+        for name, result, errors, warnings in outcomes:
+            results.append((name, result))
+            self.errors.extend(errors)
+            self.warnings.extend(warnings)
 
         all_passed = all(result for _, result in results)
 
@@ -55,17 +121,34 @@ class QualityChecker:
 
         return document
 
+    def _run_check(self, name, check, scan) -> Tuple[str, bool, List[str], List[str]]:
+        """Run one check, collecting its errors and warnings separately"""
+        log = self._check_log
+        log.errors = []
+        log.warnings = []
+        try:
+            try:
+                result = check(scan)
+            except Exception as e:
+                self.log_error(f"{name} check failed: {str(e)}")
+                result = False
+            return name, result, log.errors, log.warnings
+        finally:
+            log.errors = None
+            log.warnings = None
+
     def check_timestamp_coverage(self, document: str) -> bool:
         """Ensure timestamps are present in output"""
-        output_timestamps = self.extract_output_timestamps(document)
+        output_index = self.output_index(document)
 
-        if not output_timestamps:
+        if not len(output_index):
             self.log_error("No timestamps found in document")
             return False
 
-        if self.source:
-            source_timestamps = self.extract_source_timestamps()
-            missing = set(source_timestamps) - set(output_timestamps)
+        source_index = self.source_index()
+        if len(source_index):
+            # Range-aware: a source range split across several output ranges still counts
+            missing = output_index.uncovered(source_index)
 
             if missing:
                 self.log_warning(f"Some source timestamps may be missing: {len(missing)} timestamps")
@@ -74,29 +157,22 @@ class QualityChecker:
 
     def check_timestamp_continuity(self, document: str) -> bool:
         """Verify no large gaps in timestamp ranges"""
-        timestamps = self.extract_output_timestamps(document)
+        output_index = self.output_index(document)
 
-        if not timestamps:
+        if not len(output_index):
             return True  # Already checked in coverage
 
-        sorted_ts = sorted(timestamps, key=self.timestamp_to_seconds)
-
-        for i in range(len(sorted_ts) - 1):
-            current_seconds = self.timestamp_to_seconds(sorted_ts[i])
-            next_seconds = self.timestamp_to_seconds(sorted_ts[i + 1])
-
-            gap = next_seconds - current_seconds
-
-            # Allow up to 5 minute gaps (could be chapter breaks)
-            if gap > 300:  # 5 minutes
-                self.log_warning(f"Large gap detected between timestamps: {sorted_ts[i]} to {sorted_ts[i+1]}")
+        # Allow up to 5 minute gaps (could be chapter breaks)
+        for before, after, _ in output_index.gaps(300):
+            self.log_warning(f"Large gap detected between timestamps: {before} to {after}")
 
         return True
 
     def check_bilingual_completeness(self, document: str) -> bool:
         """Verify bilingual headers are present"""
         # Check for headers with pipe separator (Arabic | English)
-        bilingual_headers = re.findall(r'^#{1,4}\s+.+\s+\|\s+.+$', document, re.MULTILINE)
+        bilingual_headers = [text for _, _, text in self.scan_document(document).headers
+                             if BILINGUAL_HEADER_PATTERN.match(text)]
 
         if not bilingual_headers:
             self.log_warning("Few bilingual headers found - may need manual review")
@@ -105,32 +181,24 @@ class QualityChecker:
 
     def check_structure_hierarchy(self, document: str) -> bool:
         """Verify markdown hierarchy is correct"""
-        lines = document.split('\n')
         header_stack = []
 
-        for i, line in enumerate(lines, 1):
-            if line.startswith('#') and not line.startswith('#!'):
-                # Count # symbols
-                level = len(line) - len(line.lstrip('#'))
+        for i, level, line in self.scan_document(document).headers:
+            # Check proper nesting (allow skipping levels down but not up)
+            if header_stack and level > header_stack[-1] + 1:
+                self.log_warning(f"Header hierarchy skip at line {i}: {line[:50]}")
 
-                # Check proper nesting (allow skipping levels down but not up)
-                if header_stack and level > header_stack[-1] + 1:
-                    self.log_warning(f"Header hierarchy skip at line {i}: {line[:50]}")
-
-                # Update stack
-                while header_stack and header_stack[-1] >= level:
-                    header_stack.pop()
-                header_stack.append(level)
+            # Update stack
+            while header_stack and header_stack[-1] >= level:
+                header_stack.pop()
+            header_stack.append(level)
 
         return True
 
     def check_arabic_preservation(self, document: str) -> bool:
         """Verify Arabic text is present"""
         # Check for Arabic characters
-        arabic_pattern = re.compile(r'[\u0600-\u06FF]+')
-        arabic_found = arabic_pattern.search(document)
-
-        if not arabic_found:
+        if not self.scan_document(document).has_arabic:
             self.log_error("No Arabic text found in document")
             return False
 
@@ -139,17 +207,15 @@ class QualityChecker:
     def check_formatting_consistency(self, document: str) -> bool:
         """Verify consistent formatting throughout"""
 
-        # Check timestamp format: (MM:SS) or (MM:SS-MM:SS) or (H:MM:SS)
-        timestamp_pattern = r'\(\d{1,2}:\d{2}(?::\d{2})?(?:-\d{1,2}:\d{2}(?::\d{2})?)?\)'
-        timestamps = re.findall(timestamp_pattern, document)
+        scan = self.scan_document(document)
 
-        if not timestamps:
+        # Check timestamp format: (MM:SS) or (MM:SS-MM:SS) or (H:MM:SS)
+        if not scan.timestamps:
             self.log_error("No properly formatted timestamps found")
             return False
 
         # Check for bilingual headers: Arabic | English
-        header_pattern = r'^##+ .+ \| .+$'
-        headers = re.findall(header_pattern, document, re.MULTILINE)
+        headers = [text for _, _, text in scan.headers if SECTION_HEADER_PATTERN.match(text)]
 
         if not headers:
             self.log_warning("Few bilingual headers found")
@@ -157,44 +223,34 @@ class QualityChecker:
         return True
 
     def extract_source_timestamps(self) -> List[str]:
-        """Extract timestamps from source file"""
-        if not self.source:
-            return []
-
-        # Match timestamps in format (MM:SS), (H:MM:SS), (MM:SS-MM:SS)
-        pattern = r'\((\d{1,2}:\d{2}(?::\d{2})?(?:-\d{1,2}:\d{2}(?::\d{2})?)?)\)'
-        matches = re.findall(pattern, self.source)
-        return matches
+        """Extract timestamps from source file, scanned line by line on first use"""
+        if self.source_timestamps is None:
+            if not self.source_file:
+                return []
+            scan = DocumentScan()
+            with TranscriptReader(self.source_file) as reader:
+                for start, end in reader.iter_chunk_ranges():
+                    scan.feed_text(reader.text(start, end))
+            self.source_timestamps = scan.timestamps
+        return self.source_timestamps
 
     def extract_output_timestamps(self, document: str) -> List[str]:
         """Extract timestamps from output document"""
-        # Match timestamps in format (MM:SS), (H:MM:SS), (MM:SS-MM:SS)
-        pattern = r'\((\d{1,2}:\d{2}(?::\d{2})?(?:-\d{1,2}:\d{2}(?::\d{2})?)?)\)'
-        matches = re.findall(pattern, document)
-        return matches
+        return self.scan_document(document).timestamps
 
     def timestamp_to_seconds(self, timestamp: str) -> int:
-        """Convert timestamp string to seconds"""
-        # Handle range timestamps - take the start time
-        if '-' in timestamp:
-            timestamp = timestamp.split('-')[0]
-
-        parts = timestamp.split(':')
-        if len(parts) == 2:  # MM:SS
-            minutes, seconds = map(int, parts)
-            return minutes * 60 + seconds
-        elif len(parts) == 3:  # H:MM:SS
-            hours, minutes, seconds = map(int, parts)
-            return hours * 3600 + minutes * 60 + seconds
-        return 0
+        """Convert timestamp string to seconds (start time for ranges)"""
+        return parse_timestamp(timestamp)[0]
 
     def log_error(self, message: str):
         """Log an error"""
-        self.errors.append(message)
+        errors = getattr(self._check_log, 'errors', None)
+        (self.errors if errors is None else errors).append(message)
 
     def log_warning(self, message: str):
         """Log a warning"""
-        self.warnings.append(message)
+        warnings = getattr(self._check_log, 'warnings', None)
+        (self.warnings if warnings is None else warnings).append(message)
 
     def generate_error_report(self, results: List[Tuple[str, bool]]) -> str:
         """Generate error report"""
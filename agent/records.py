@@ -0,0 +1,164 @@
+"""
+Records
+Compact __slots__ records for analyses, segment plans, segment files and results
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class Record:
+    """
+    Base for fixed-field records.
+
+    Fields are __slots__, so a record carries no per-instance dict and
+    attribute access is a slot lookup. Item access (record['field'],
+    record.get('field')) is kept for code written against the plain dicts
+    these records replace; to_dict/from_dict convert for JSON.
+    """
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = []
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get('__slots__', ()):
+                if name not in fields:
+                    fields.append(name)
+        cls._fields = tuple(fields)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self._fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._fields
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self._fields else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, getattr(self, name)) for name in self._fields]
+
+    def to_dict(self, exclude: Iterable[str] = ()) -> Dict[str, Any]:
+        """Plain dict of the fields, for JSON"""
+        exclude = set(exclude)
+        return {name: getattr(self, name) for name in self._fields if name not in exclude}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        """Record from a dict written by to_dict; unknown keys are ignored"""
+        return cls(**{key: value for key, value in data.items() if key in cls._fields})
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.items() == other.items()
+
+    def __repr__(self) -> str:
+        # Scalars only; per-line tables and long lists would swamp the output
+        fields = ', '.join(f"{name}={value!r}" for name, value in self.items()
+                           if isinstance(value, (str, int, float, bool, type(None))))
+        return f"{type(self).__name__}({fields})"
+
+
+class TranscriptAnalysis(Record):
+    """
+    Structure of one transcript. The text itself is never kept: the per-line
+    tables (arrays of byte offsets, token estimates and boundary strengths)
+    address it in the file.
+    """
+
+    __slots__ = ('filename', 'source_file', 'content_hash', 'line_count', 'char_count', 'byte_count',
+                 'duration', 'chapters', 'hadith_numbers', 'timestamp_ranges',
+                 'line_offsets', 'line_tokens', 'line_boundaries')
+
+    def __init__(self, filename: str = '', source_file: str = '', content_hash: Optional[str] = None,
+                 line_count: int = 0, char_count: int = 0, byte_count: int = 0, duration: str = "Unknown",
+                 chapters: Optional[list] = None, hadith_numbers: Optional[list] = None,
+                 timestamp_ranges: Optional[list] = None, line_offsets=None, line_tokens=None,
+                 line_boundaries=None):
+        self.filename = filename
+        self.source_file = source_file
+        self.content_hash = content_hash
+        self.line_count = line_count
+        self.char_count = char_count
+        self.byte_count = byte_count
+        self.duration = duration
+        self.chapters = chapters if chapters is not None else []
+        self.hadith_numbers = hadith_numbers if hadith_numbers is not None else []
+        self.timestamp_ranges = timestamp_ranges if timestamp_ranges is not None else []
+        self.line_offsets = line_offsets
+        self.line_tokens = line_tokens
+        self.line_boundaries = line_boundaries
+
+
+class Segment(Record):
+    """
+    One planned part: a line range of the transcript, its byte offsets, and
+    the wider context window written with it (equal to the range without overlap).
+    """
+
+    __slots__ = ('part_number', 'start_line', 'end_line', 'line_count', 'start_offset', 'end_offset',
+                 'token_estimate', 'context_start_line', 'context_end_line',
+                 'context_start_offset', 'context_end_offset')
+
+    def __init__(self, part_number: int, start_line: int, end_line: int, start_offset: int, end_offset: int,
+                 token_estimate: int = 0, line_count: Optional[int] = None,
+                 context_start_line: Optional[int] = None, context_end_line: Optional[int] = None,
+                 context_start_offset: Optional[int] = None, context_end_offset: Optional[int] = None):
+        self.part_number = part_number
+        self.start_line = start_line
+        self.end_line = end_line
+        self.line_count = end_line - start_line if line_count is None else line_count
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+        self.token_estimate = token_estimate
+        self.context_start_line = start_line if context_start_line is None else context_start_line
+        self.context_end_line = end_line if context_end_line is None else context_end_line
+        self.context_start_offset = start_offset if context_start_offset is None else context_start_offset
+        self.context_end_offset = end_offset if context_end_offset is None else context_end_offset
+
+    @property
+    def overlap(self) -> bool:
+        """Whether the written segment opens with context repeated from the previous part"""
+        return self.context_start_offset < self.start_offset
+
+
+class SegmentFiles(Record):
+    """Work files of one prepared part"""
+
+    __slots__ = ('part_number', 'segment_file', 'instruction_file', 'output_file', 'changed', 'overlap')
+
+    def __init__(self, part_number: int, segment_file: str, instruction_file: str, output_file: str,
+                 changed: bool = False, overlap: bool = False):
+        self.part_number = part_number
+        self.segment_file = segment_file
+        self.instruction_file = instruction_file
+        self.output_file = output_file
+        self.changed = changed
+        self.overlap = overlap
+
+
+class ProcessingResult(Record):
+    """Result of processing a lecture"""
+
+    __slots__ = ('output_path', 'word_count', 'timestamp_coverage', 'quality_score',
+                 'lecture_number', 'part_count')
+
+    def __init__(self, output_path: str, word_count: int, timestamp_coverage: float, quality_score: float,
+                 lecture_number: Optional[int] = None, part_count: Optional[int] = None):
+        self.output_path = output_path
+        self.word_count = word_count
+        self.timestamp_coverage = timestamp_coverage
+        self.quality_score = quality_score
+        self.lecture_number = lecture_number
+        self.part_count = part_count
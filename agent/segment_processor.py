@@ -0,0 +1,200 @@
+"""
+Segment Processors
+Backends that turn prepared segments into formatted part outputs, and the worker pool that drives them
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from instructions import load_instructions
+from instrumentation import Instrumentation
+from tokenizer import CHAPTER, HADITH, scan_line
+from transcript_reader import TranscriptReader
+
+
+# Stand-in backends write here unless folders are given, so their output never
+# lands next to real part outputs, notes and indexes
+SCRATCH_FOLDER = 'stub_run'
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every thread using one backend: at most
+    rate_per_second calls on average, with bursts of up to burst calls.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SegmentProcessor:
+    """
+    Base class for processing backends.
+
+    A backend receives the expanded instructions and the segment text of one
+    part and returns its formatted notes. Limits belong to the backend
+    instance, so every pool sharing it respects them together:
+    max_concurrency calls in flight and, when set, rate_per_second calls
+    started per second.
+
+    stand_in marks backends whose output is not real notes.
+    """
+
+    stand_in = False
+
+    def __init__(self, max_concurrency: int = 1, rate_per_second: Optional[float] = None, burst: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_per_second = rate_per_second
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._limiter = RateLimiter(rate_per_second, burst) if rate_per_second else None
+
+    def describe(self) -> str:
+        description = f"{type(self).__name__}:concurrency={self.max_concurrency}"
+        if self.rate_per_second:
+            description += f":rate={self.rate_per_second:g}/s"
+        return description
+
+    def process(self, instructions: str, segment: str, segment_info: Dict[str, Any]) -> str:
+        """Formatted notes for one segment"""
+        raise NotImplementedError
+
+    def __call__(self, instructions: str, segment: str, segment_info: Dict[str, Any]) -> str:
+        """process() within the backend's concurrency and rate limits"""
+        with self._slots:
+            if self._limiter:
+                self._limiter.acquire()
+            return self.process(instructions, segment, segment_info)
+
+
+class LocalStubProcessor(SegmentProcessor):
+    """
+    Deterministic stand-in backend for tests and benchmarks.
+
+    Output is derived from the segment alone: chapter lines become bilingual
+    chapter headers, hadith lines become subsection headers and every other
+    line (timestamps included) is kept verbatim, so the merged notes pass the
+    quality checks. latency simulates the round trip of a remote backend.
+    """
+
+    stand_in = True
+
+    def __init__(self, latency: float = 0.0, max_concurrency: int = 8,
+                 rate_per_second: Optional[float] = None, burst: int = 1):
+        super().__init__(max_concurrency, rate_per_second, burst)
+        self.latency = latency
+
+    def process(self, instructions: str, segment: str, segment_info: Dict[str, Any]) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+
+        lines = [f"## الدرس {segment_info['lecture_num']:02d} - الجزء {segment_info['part_num']} | "
+                 f"Lecture {segment_info['lecture_num']:02d} - Part {segment_info['part_num']}", ""]
+        for line_number, line in enumerate(segment.splitlines(), 1):
+            kinds = {token.kind for token in scan_line(line, line_number)}
+            if CHAPTER in kinds:
+                lines.append(f"## {line.strip()} | Chapter")
+            elif HADITH in kinds:
+                lines.append(f"### {line.strip()}")
+            else:
+                lines.append(line)
+        return '\n'.join(lines) + '\n'
+
+
+BACKENDS = {
+    'stub': LocalStubProcessor,
+}
+
+
+def create_processor(name: str, **options) -> SegmentProcessor:
+    """Backend registered under name, built with the given options"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}' (available: {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name](**options)
+
+
+def run_folders(processor: SegmentProcessor, working_folder: Optional[str] = None,
+                destination_folder: Optional[str] = None) -> Tuple[str, str]:
+    """(working, destination) folders for a run: as given, else scratch folders for stand-in backends"""
+    if processor.stand_in:
+        working_folder = working_folder or os.path.join(SCRATCH_FOLDER, 'working')
+        destination_folder = destination_folder or os.path.join(SCRATCH_FOLDER, 'outputs')
+    return working_folder or 'working', destination_folder or 'outputs'
+
+
+class SegmentWorkerPool:
+    """
+    Runs segments through a backend on a thread pool.
+
+    Each part output is written to a temporary file and renamed into place,
+    so an output file only ever exists complete. A failing part is reported
+    in its result and does not stop the others.
+    """
+
+    def __init__(self, processor: SegmentProcessor, workers: int = 4,
+                 instrumentation: Optional[Instrumentation] = None):
+        self.processor = processor
+        self.workers = max(1, min(workers, processor.max_concurrency))
+        self.instrumentation = instrumentation or Instrumentation()
+
+    def process_all(self, segments: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process every segment; results come back in input order"""
+        segments = list(segments)
+        if not segments:
+            return []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='segment') as pool:
+            return list(pool.map(self.process_one, segments))
+
+    def process_one(self, segment_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Process one segment and write its output"""
+        result = {
+            'lecture_num': segment_info['lecture_num'],
+            'part_num': segment_info['part_num'],
+            'output_file': segment_info['output_file'],
+            'error': None
+        }
+
+        with self.instrumentation.phase('segment_process', event='segment', lecture=segment_info['lecture_num'],
+                                        part=segment_info['part_num']) as record:
+            try:
+                instructions = load_instructions(segment_info['instruction_file'])
+                with TranscriptReader(segment_info['segment_file']) as reader:
+                    segment = reader.text()
+
+                output = self.processor(instructions, segment, segment_info)
+
+                data = output.encode('utf-8')
+                tmp_path = f"{segment_info['output_file']}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, segment_info['output_file'])
+
+                result['bytes_read'] = len(segment.encode('utf-8'))
+                result['bytes_written'] = len(data)
+            except Exception as e:
+                result['error'] = str(e)
+                print(f"  ✗ Lecture {segment_info['lecture_num']:02d} Part {segment_info['part_num']}: {e}")
+
+            record.update((key, result[key]) for key in ('bytes_read', 'bytes_written', 'error') if key in result)
+
+        result['seconds'] = record['wall_seconds']
+        return result
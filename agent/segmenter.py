@@ -0,0 +1,189 @@
+"""
+Segmentation Engine
+Plans processing segments as line ranges of the source transcript
+"""
+
+from typing import List, Iterable, Tuple
+
+import tokenizer
+from records import Segment, TranscriptAnalysis
+from token_estimator import ESTIMATOR_VERSION, estimate_tokens, estimate_line_tokens
+
+
+# Preference order for cut points: a segment should start at a new chapter
+# before a new hadith, and at a new hadith before a plain timestamp
+NO_BOUNDARY = 0
+TIMESTAMP_BOUNDARY = 1
+HADITH_BOUNDARY = 2
+CHAPTER_BOUNDARY = 3
+
+BOUNDARY_STRENGTH = {
+    tokenizer.TIMESTAMP: TIMESTAMP_BOUNDARY,
+    tokenizer.HADITH: HADITH_BOUNDARY,
+    tokenizer.CHAPTER: CHAPTER_BOUNDARY,
+}
+
+
+def boundary_strength(tokens: Iterable[tokenizer.Token]) -> int:
+    """Strongest boundary marker among a line's tokens"""
+    strength = NO_BOUNDARY
+    for token in tokens:
+        strength = max(strength, BOUNDARY_STRENGTH.get(token.kind, NO_BOUNDARY))
+    return strength
+
+
+class SegmentationStrategy:
+    """
+    Base class for segmentation strategies.
+
+    Strategies work on the line tables recorded by analyze_transcript
+    ('line_offsets', 'line_tokens', 'line_boundaries') and never see the
+    transcript text itself; segments are described as line and byte ranges.
+
+    With overlap_tokens > 0 every segment also opens with up to that many
+    tokens of context from before it (on top of max_tokens), snapped to a
+    timestamp or stronger boundary so the merge can drop the repeated
+    sections again. Context is only added at the head: the merge trims the
+    start of a part against the part before it, and a tail copy of the next
+    part's opening would have nothing to be trimmed against.
+    """
+
+    def __init__(self, max_tokens: int = 6000, overlap_tokens: int = 0):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def estimate_tokens(self, line: str) -> int:
+        """Token estimate for one line, plus one for its line break"""
+        return estimate_tokens(line) + 1
+
+    def estimate_line_tokens(self, text: str) -> List[int]:
+        """estimate_tokens of every line of a block of lines"""
+        return [estimate + 1 for estimate in estimate_line_tokens(text)]
+
+    def describe(self) -> str:
+        """Configuration fingerprint; plans are only reusable under the same one"""
+        description = (f"{type(self).__name__}:max_tokens={self.max_tokens}:estimator=v{ESTIMATOR_VERSION}"
+                       f":tokenizer=v{tokenizer.TOKENIZER_VERSION}")
+        if self.overlap_tokens:
+            description += f":overlap_head={self.overlap_tokens}"
+        return description
+
+    def split(self, analysis: TranscriptAnalysis) -> List[Tuple[int, int]]:
+        """Return (start_line, end_line) ranges, end exclusive"""
+        raise NotImplementedError
+
+    def plan(self, analysis: TranscriptAnalysis) -> List[Segment]:
+        """Build segment descriptors for every range"""
+        offsets = analysis.line_offsets
+        tokens = analysis.line_tokens
+
+        ranges = self.split(analysis) or [(0, 0)]
+
+        segments = []
+        for start, end in ranges:
+            context_start, context_end = self.context_window(analysis, start, end)
+            segments.append(Segment(
+                part_number=len(segments) + 1,
+                start_line=start,
+                end_line=end,
+                start_offset=offsets[start],
+                end_offset=offsets[end],
+                token_estimate=sum(tokens[start:end]),
+                context_start_line=context_start,
+                context_end_line=context_end,
+                context_start_offset=offsets[context_start],
+                context_end_offset=offsets[context_end]
+            ))
+
+        return segments
+
+    def context_window(self, analysis: TranscriptAnalysis, start: int, end: int) -> Tuple[int, int]:
+        """(context_start, context_end) lines around a segment; equal to the segment without overlap"""
+        if not self.overlap_tokens:
+            return start, end
+
+        tokens = analysis.line_tokens
+        boundaries = analysis.line_boundaries
+
+        # As many preceding lines as fit, then start at the first boundary inside them
+        head = start
+        total = 0
+        while head > 0 and total + tokens[head - 1] <= self.overlap_tokens:
+            head -= 1
+            total += tokens[head]
+        while head < start and boundaries[head] == NO_BOUNDARY:
+            head += 1
+
+        return head, end
+
+
+class FixedBudgetSegmenter(SegmentationStrategy):
+    """Fill each segment up to the token budget and cut wherever it runs out"""
+
+    def split(self, analysis: TranscriptAnalysis) -> List[Tuple[int, int]]:
+        tokens = analysis.line_tokens
+        ranges = []
+        start = 0
+        total = 0
+
+        for i, weight in enumerate(tokens):
+            if total + weight > self.max_tokens and i > start:
+                ranges.append((start, i))
+                start = i
+                total = 0
+            total += weight
+
+        if start < len(tokens):
+            ranges.append((start, len(tokens)))
+
+        return ranges
+
+
+class BoundaryAwareSegmenter(SegmentationStrategy):
+    """
+    Fill each segment up to the token budget, then move the cut back to the
+    strongest chapter/hadith/timestamp boundary that still leaves the segment
+    at least min_fill of the budget.
+    """
+
+    def __init__(self, max_tokens: int = 6000, min_fill: float = 0.5, overlap_tokens: int = 0):
+        super().__init__(max_tokens, overlap_tokens)
+        self.min_fill = min_fill
+
+    def describe(self) -> str:
+        return f"{super().describe()}:min_fill={self.min_fill}"
+
+    def split(self, analysis: TranscriptAnalysis) -> List[Tuple[int, int]]:
+        tokens = analysis.line_tokens
+        boundaries = analysis.line_boundaries
+        line_total = len(tokens)
+        min_tokens = self.max_tokens * self.min_fill
+
+        ranges = []
+        start = 0
+
+        while start < line_total:
+            # Extend the segment as far as the budget allows (always at least one line)
+            end = start + 1
+            total = tokens[start]
+            earliest_cut = None
+            while end < line_total and total + tokens[end] <= self.max_tokens:
+                if earliest_cut is None and total >= min_tokens:
+                    earliest_cut = end
+                total += tokens[end]
+                end += 1
+
+            # Cut before the strongest boundary line, latest one on ties
+            if end < line_total and earliest_cut is not None:
+                best = end
+                for candidate in range(end, earliest_cut - 1, -1):
+                    if boundaries[candidate] > boundaries[best]:
+                        best = candidate
+                        if boundaries[best] == CHAPTER_BOUNDARY:
+                            break
+                end = best
+
+            ranges.append((start, end))
+            start = end
+
+        return ranges
@@ -0,0 +1,90 @@
+"""
+Timestamp Index
+Timestamps and ranges of one document as integer-second intervals
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Iterable, List, Tuple
+
+
+def parse_time(text: str) -> int:
+    """Convert MM:SS or H:MM:SS to seconds"""
+    parts = text.split(':')
+    if len(parts) == 2:  # MM:SS
+        minutes, seconds = map(int, parts)
+        return minutes * 60 + seconds
+    elif len(parts) == 3:  # H:MM:SS
+        hours, minutes, seconds = map(int, parts)
+        return hours * 3600 + minutes * 60 + seconds
+    return 0
+
+
+def parse_timestamp(timestamp: str) -> Tuple[int, int]:
+    """(start, end) seconds of a timestamp; single points have start == end"""
+    if '-' in timestamp:
+        start, end = timestamp.split('-', 1)
+        start_seconds, end_seconds = parse_time(start), parse_time(end)
+        return start_seconds, max(start_seconds, end_seconds)
+    seconds = parse_time(timestamp)
+    return seconds, seconds
+
+
+class TimestampIndex:
+    """
+    Parses every timestamp once into compact start/end arrays.
+
+    Coverage queries work on ranges rather than exact strings: a source
+    (1:00-2:00) is covered by output (1:00-1:30) plus (1:30-2:00), and a
+    source point (1:15) by any output range that contains it.
+    """
+
+    def __init__(self, timestamps: Iterable[str]):
+        self.timestamps = list(timestamps)
+        self.starts = array('i')
+        self.ends = array('i')
+        for timestamp in self.timestamps:
+            start, end = parse_timestamp(timestamp)
+            self.starts.append(start)
+            self.ends.append(end)
+
+        # Entry indexes ordered by start; transcripts are mostly in order already
+        self.order = sorted(range(len(self.starts)), key=self.starts.__getitem__)
+
+        # Union of all intervals as disjoint, sorted (start, end) runs
+        self.union_starts = array('i')
+        self.union_ends = array('i')
+        for i in self.order:
+            start, end = self.starts[i], self.ends[i]
+            if self.union_ends and start <= self.union_ends[-1]:
+                if end > self.union_ends[-1]:
+                    self.union_ends[-1] = end
+            else:
+                self.union_starts.append(start)
+                self.union_ends.append(end)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def covers(self, start: int, end: int) -> bool:
+        """True if [start, end] lies inside the union of this index's intervals"""
+        run = bisect_right(self.union_starts, start) - 1
+        return run >= 0 and self.union_ends[run] >= end
+
+    def uncovered(self, other: 'TimestampIndex') -> List[str]:
+        """Timestamps of other that this index does not cover"""
+        return [other.timestamps[i] for i in range(len(other))
+                if not self.covers(other.starts[i], other.ends[i])]
+
+    def gaps(self, max_gap: int) -> List[Tuple[str, str, int]]:
+        """(before, after, seconds) for every stretch longer than max_gap with no timestamp, in one sweep"""
+        gaps = []
+        reach = None
+        reach_index = None
+        for i in self.order:
+            if reach is not None and self.starts[i] - reach > max_gap:
+                gaps.append((self.timestamps[reach_index], self.timestamps[i], self.starts[i] - reach))
+            if reach is None or self.ends[i] >= reach:
+                reach = self.ends[i]
+                reach_index = i
+        return gaps
@@ -0,0 +1,100 @@
+"""
+Token Estimator
+Fast, table-driven token count estimate for mixed Arabic/English text
+"""
+
+import math
+from typing import Dict, List
+
+
+# Bump whenever the classes or weights change; plans made with another version are not reused
+ESTIMATOR_VERSION = 1
+
+# Character classes, as the single characters str.translate maps them to
+ARABIC = 'a'
+HARAKA = 'h'
+LATIN = 'l'
+DIGIT = 'd'
+PUNCT = 'p'
+SPACE = ' '
+
+# Tokens per character of each class. Undiacritized Arabic merges into
+# tokens of about two letters, English into tokens of about 3.5 letters;
+# harakat rarely merge with their letter and cost roughly half a token each.
+WEIGHTS = {
+    ARABIC: 1 / 2.2,
+    HARAKA: 0.5,
+    LATIN: 1 / 3.6,
+    DIGIT: 0.5,
+    PUNCT: 0.6,
+    SPACE: 0.0,
+}
+# Anything not in the table (extended Latin, symbols, emoji, ...)
+OTHER_WEIGHT = 0.8
+
+
+def _build_table() -> Dict[int, str]:
+    table = {}
+
+    def assign(first: int, last: int, kind: str):
+        for code in range(first, last + 1):
+            table[code] = kind
+
+    assign(0x21, 0x7E, PUNCT)
+    assign(ord('a'), ord('z'), LATIN)
+    assign(ord('A'), ord('Z'), LATIN)
+    assign(ord('0'), ord('9'), DIGIT)
+    for char in ' \t\r\n\u00a0\u200c\u200d\u200f':
+        table[ord(char)] = SPACE
+
+    # Arabic block and supplements
+    assign(0x0620, 0x064A, ARABIC)
+    assign(0x066E, 0x06D3, ARABIC)
+    assign(0x06FA, 0x06FF, ARABIC)
+    assign(0x0750, 0x077F, ARABIC)
+    assign(0x064B, 0x065F, HARAKA)
+    table[0x0670] = HARAKA  # superscript alef
+    table[0x0640] = HARAKA  # tatweel
+    assign(0x06D6, 0x06ED, HARAKA)
+    assign(0x0660, 0x0669, DIGIT)
+    assign(0x06F0, 0x06F9, DIGIT)
+    for code in (0x060C, 0x061B, 0x061F, 0x066A, 0x066B, 0x066C, 0x066D, 0x06D4):
+        table[code] = PUNCT
+
+    return table
+
+
+CLASS_TABLE = _build_table()
+
+# Same classes, but line breaks stay line breaks so the classes of a block split into its lines
+LINE_CLASS_TABLE = {code: kind for code, kind in CLASS_TABLE.items() if code != ord('\n')}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimated token count of text. Characters are mapped to their class in
+    one str.translate call and each class is counted with str.count, so the
+    per-character work stays in C.
+    """
+    if not text:
+        return 0
+    return _estimate(text.translate(CLASS_TABLE))
+
+
+def estimate_line_tokens(text: str) -> List[int]:
+    """estimate_tokens of every line of text, translating the whole block at once"""
+    return [_estimate(classes) for classes in text.translate(LINE_CLASS_TABLE).split('\n')]
+
+
+def _estimate(classes: str) -> int:
+    """Estimate from text already mapped to classes (one character per character)"""
+    total = 0.0
+    classified = 0
+    for kind, weight in WEIGHTS.items():
+        count = classes.count(kind)
+        classified += count
+        total += count * weight
+
+    # Characters outside the table keep their own code point and count as "other"
+    total += (len(classes) - classified) * OTHER_WEIGHT
+    return math.ceil(total)
@@ -0,0 +1,243 @@
+"""
+Transcript Tokenizer
+Scanner shared by the processor and the quality checker
+"""
+
+import re
+from typing import Iterable, Iterator, List, Optional
+
+
+# Token kinds
+TIMESTAMP = 'timestamp'   # (MM:SS), (H:MM:SS) or (MM:SS-MM:SS) - value is the text inside the parens
+CHAPTER = 'chapter'       # كتاب ... / باب ... marker
+HADITH = 'hadith'         # hadith number - value is an int
+HEADER = 'header'         # markdown header line - value is the full line
+
+# Bumped whenever the same text can tokenize differently, so cached analyses are redone
+TOKENIZER_VERSION = 3
+
+TIME = r'\d{1,2}:\d{2}(?::\d{2})?'
+
+# Whitespace that \s matches, minus the newline: whole documents are scanned
+# at once, and no token may run from one line into the next
+SPACE = r'[\t\x0b-\r\x1c-\x20\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]'
+
+# One pattern per kind: each starts with a literal or a short character set,
+# which the regex engine skips ahead to, where an alternation of all kinds
+# would be tried at every position
+TIMESTAMP_PATTERN = re.compile(rf'\(({TIME}(?:-{TIME})?)\)')
+CLOCK_PATTERN = re.compile(TIME)
+CHAPTER_PATTERN = re.compile(rf'(?:كتاب|باب){SPACE}+(?:{SPACE}|[\u0600-\u06FF])+')
+# The optional ال is added back by hand; as part of the pattern it would take away the literal start
+HADITH_ARABIC_PATTERN = re.compile(rf'حديث{SPACE}+(?:رقم{SPACE}+)?(\d+)')
+HADITH_ENGLISH_PATTERN = re.compile(rf'(?i:hadith{SPACE}+(?:number{SPACE}+)?)(\d+)')
+HEADER_PATTERN = re.compile(r'^#(?!!).*', re.MULTILINE)
+ARABIC_PATTERN = re.compile(r'[\u0600-\u06FF]')
+
+
+def _is_arabic(char: str) -> bool:
+    return '\u0600' <= char <= '\u06FF'
+
+
+class Token:
+    """A typed match and its position in the scanned text"""
+
+    __slots__ = ('kind', 'value', 'start', 'end', 'line')
+
+    def __init__(self, kind: str, value, start: int, end: int, line: int):
+        self.kind = kind
+        self.value = value
+        self.start = start
+        self.end = end
+        self.line = line
+
+    def __repr__(self):
+        return f"Token({self.kind!r}, {self.value!r}, {self.start}, {self.end}, line={self.line})"
+
+
+def header_level(line: str) -> int:
+    """Number of leading '#' characters, 0 if the line is not a header"""
+    if not line.startswith('#') or line.startswith('#!'):
+        return 0
+    return len(line) - len(line.lstrip('#'))
+
+
+def _scan(text: str, start: int, end: int, line: int) -> List[Token]:
+    """
+    Tokens of text[start:end] in position order, all numbered line.
+
+    Each kind is one pass of its own pattern, skipped when its marker text
+    does not occur at all, so most lines of a transcript cost a few find()
+    calls and whole documents a handful of regex passes.
+    """
+    tokens = []
+
+    if text.find('#', start, end) != -1:
+        tokens.extend(Token(HEADER, match.group(), match.start(), match.end(), line)
+                      for match in HEADER_PATTERN.finditer(text, start, end))
+
+    if text.find('(', start, end) != -1:
+        tokens.extend(Token(TIMESTAMP, match.group(1), match.start(), match.end(), line)
+                      for match in TIMESTAMP_PATTERN.finditer(text, start, end))
+
+    if text.find('باب', start, end) != -1 or text.find('كتاب', start, end) != -1:
+        pos = start
+        while True:
+            match = CHAPTER_PATTERN.search(text, pos, end)
+            if match is None:
+                break
+            # A marker only counts at the start of a word (not in الكتاب)
+            if match.start() > start and _is_arabic(text[match.start() - 1]):
+                pos = match.start() + 1
+                continue
+            tokens.append(Token(CHAPTER, match.group(), match.start(), match.end(), line))
+            pos = match.end()
+
+    # Hadith mentions sit inside chapter titles and prefixed words (وحديث, فالحديث, بالحديث)
+    if text.find('حديث', start, end) != -1:
+        for match in HADITH_ARABIC_PATTERN.finditer(text, start, end):
+            begin = match.start()
+            if begin - 2 >= start and text.startswith('ال', begin - 2):
+                begin -= 2
+            tokens.append(Token(HADITH, int(match.group(1)), begin, match.end(), line))
+
+    tokens.extend(Token(HADITH, int(match.group(1)), match.start(), match.end(), line)
+                  for match in HADITH_ENGLISH_PATTERN.finditer(text, start, end))
+
+    tokens.sort(key=lambda token: token.start)
+    return tokens
+
+
+def scan_line(text: str, line_number: int = 1, start: int = 0,
+              end: Optional[int] = None) -> Iterator[Token]:
+    """Yield tokens for one line of text (text[start:end], without the newline)"""
+    return iter(_scan(text, start, len(text) if end is None else end, line_number))
+
+
+def iter_tokens(text: str, first_line: int = 1) -> Iterator[Token]:
+    """Yield tokens for a whole document with offsets into text"""
+    line_number = first_line
+    pos = 0
+    for token in _scan(text, 0, len(text), first_line):
+        line_number += text.count('\n', pos, token.start)
+        pos = token.start
+        token.line = line_number
+        yield token
+
+
+def tokenize(text: str) -> List[Token]:
+    """Scan a document once and return all of its tokens"""
+    return list(iter_tokens(text))
+
+
+def last_clock(text: str) -> Optional[str]:
+    """
+    Last MM:SS / H:MM:SS reading in text, timestamps included. A reading
+    never spans lines, so only the last line with a ':' in it is scanned
+    (and earlier ones only while they hold no reading).
+    """
+    end = len(text)
+    while True:
+        colon = text.rfind(':', 0, end)
+        if colon == -1:
+            return None
+        line_start = text.rfind('\n', 0, colon) + 1
+        line_end = text.find('\n', colon)
+        last = None
+        for last in CLOCK_PATTERN.finditer(text, line_start, len(text) if line_end == -1 else line_end):
+            pass
+        if last:
+            return last.group()
+        end = line_start
+
+
+class DocumentScan:
+    """Tokens of one document grouped by kind, built from whole blocks of lines at a time"""
+
+    def __init__(self):
+        self.timestamps = []       # timestamp token values, in document order
+        self.chapters = []
+        self.hadith_numbers = []
+        self.headers = []          # (line_number, level, text)
+        self.has_arabic = False
+        self.last_time = None      # last clock reading, used for duration
+        self.line_count = 0
+        self.word_count = 0
+
+    @classmethod
+    def from_text(cls, text: str) -> 'DocumentScan':
+        scan = cls()
+        scan.feed_text(text)
+        return scan
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> 'DocumentScan':
+        scan = cls()
+        for line in lines:
+            scan.feed(line.rstrip('\n'))
+        return scan
+
+    def feed_text(self, text: str) -> List[Token]:
+        """Add every line of a block of text (lines joined by newlines) and return its tokens"""
+        tokens = list(iter_tokens(text, self.line_count + 1))
+        for token in tokens:
+            self.add(token)
+        if not self.has_arabic:
+            self.has_arabic = ARABIC_PATTERN.search(text) is not None
+        self.last_time = last_clock(text) or self.last_time
+        self.line_count += text.count('\n') + 1
+        self.word_count += len(text.split())
+        return tokens
+
+    def feed(self, line: str) -> List[Token]:
+        """Add one line (without its newline) and return its tokens"""
+        return self.feed_text(line)
+
+    def add(self, token: Token):
+        """Record a token"""
+        kind = token.kind
+        if kind == TIMESTAMP:
+            self.timestamps.append(token.value)
+        elif kind == CHAPTER:
+            self.chapters.append(token.value)
+        elif kind == HADITH:
+            self.hadith_numbers.append(token.value)
+        elif kind == HEADER:
+            self.headers.append((token.line, header_level(token.value), token.value))
+
+    def extend(self, other: 'DocumentScan'):
+        """Append the scan of the text that follows this one (joined by a newline)"""
+        self.timestamps.extend(other.timestamps)
+        self.chapters.extend(other.chapters)
+        self.hadith_numbers.extend(other.hadith_numbers)
+        self.headers.extend((line + self.line_count, level, text) for line, level, text in other.headers)
+        self.has_arabic = self.has_arabic or other.has_arabic
+        self.last_time = other.last_time or self.last_time
+        self.line_count += other.line_count
+        self.word_count += other.word_count
+
+    def to_dict(self) -> dict:
+        """JSON-serializable form, used to cache scans"""
+        return {
+            'timestamps': self.timestamps,
+            'chapters': self.chapters,
+            'hadith_numbers': self.hadith_numbers,
+            'headers': self.headers,
+            'has_arabic': self.has_arabic,
+            'last_time': self.last_time,
+            'line_count': self.line_count,
+            'word_count': self.word_count
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DocumentScan':
+        scan = cls()
+        scan.timestamps = data['timestamps']
+        scan.chapters = data['chapters']
+        scan.hadith_numbers = data['hadith_numbers']
+        scan.headers = [tuple(header) for header in data['headers']]
+        scan.has_arabic = data['has_arabic']
+        scan.last_time = data['last_time']
+        scan.line_count = data['line_count']
+        scan.word_count = data['word_count']
+        return scan
@@ -0,0 +1,84 @@
+"""
+Transcript Reader
+Memory-mapped, lazily decoded access to transcript files
+"""
+
+import mmap
+from typing import Iterator, Tuple
+
+
+class TranscriptReader:
+    """
+    Maps a file read-only and decodes only the ranges that are asked for.
+
+    Lines and segments are addressed by byte offsets into the mapping, so
+    scanning a transcript or cutting a segment out of it never copies the
+    whole file into a Python string. The OS page cache is shared between
+    repeated readers of the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self.buffer = b''
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    def bytes(self, start: int = 0, end: int = None) -> bytes:
+        """Raw bytes of [start, end)"""
+        return self.buffer[start:len(self.buffer) if end is None else end]
+
+    def view(self, start: int = 0, end: int = None) -> memoryview:
+        """Zero-copy view of [start, end); release it before closing the reader"""
+        return memoryview(self.buffer)[start:len(self.buffer) if end is None else end]
+
+    def text(self, start: int = 0, end: int = None) -> str:
+        """Decoded text of [start, end)"""
+        return self.bytes(start, end).decode('utf-8')
+
+    def iter_line_ranges(self) -> Iterator[Tuple[int, int, int]]:
+        """(start, end, next_start) byte offsets of every line; end excludes the line break"""
+        buffer = self.buffer
+        size = len(buffer)
+        start = 0
+        while start < size:
+            newline = buffer.find(b'\n', start)
+            next_start = size if newline == -1 else newline + 1
+            end = next_start if newline == -1 else newline
+            if end > start and buffer[end - 1:end] == b'\r':
+                end -= 1
+            yield start, end, next_start
+            start = next_start
+
+    def iter_chunk_ranges(self, size: int = 1 << 20) -> Iterator[Tuple[int, int]]:
+        """(start, end) byte ranges of about size bytes that each end after a line break (or at the end)"""
+        buffer = self.buffer
+        total = len(buffer)
+        start = 0
+        while start < total:
+            newline = buffer.find(b'\n', min(start + size, total) - 1)
+            end = total if newline == -1 else newline + 1
+            yield start, end
+            start = end
+
+    def iter_lines(self) -> Iterator[str]:
+        """Every line decoded on its own, without its line break"""
+        buffer = self.buffer
+        for start, end, _ in self.iter_line_ranges():
+            yield buffer[start:end].decode('utf-8')
@@ -0,0 +1,174 @@
+"""
+Lecture Watcher
+Polls the source and working folders and prepares or finalizes lectures as files land
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from manifest import list_manifests, load_manifest, preparation_from_manifest
+from processor import LectureNotesAgent
+
+
+def _fingerprint(entry: os.DirEntry) -> Tuple[int, int]:
+    stat = entry.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+class LectureWatcher:
+    """
+    Keeps lectures moving without manual steps:
+
+    - a transcript that is new or changed in source_folder is prepared
+      (incrementally, so only changed parts are rewritten)
+    - a lecture whose part outputs all exist is finalized, and finalized
+      again whenever one of them changes
+
+    Each poll reads the two folders once. A file must look the same on two
+    consecutive polls before it is acted on, so half-copied transcripts and
+    outputs still being written are left alone. Jobs run on a bounded
+    thread pool, at most one per lecture at a time.
+    """
+
+    def __init__(self, source_folder: str, destination_folder: str, working_folder: str = 'working',
+                 jobs: int = 2, interval: float = 2.0, agent_options: Optional[Dict[str, Any]] = None):
+        self.source_folder = source_folder
+        self.destination_folder = destination_folder
+        self.working_folder = working_folder
+        self.interval = interval
+        self.agent_options = agent_options or {}
+
+        self._pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='watch')
+        self._futures = {}             # future -> (kind, lecture, fingerprint, args)
+        self._busy = set()             # lectures with a job in flight
+        self._local = threading.local()
+
+        self._seen_sources = {}        # path -> fingerprint on the previous poll
+        self._prepared_sources = {}    # path -> fingerprint last prepared
+        self._outputs = {}             # lecture -> output file names of its parts
+        self._seen_outputs = {}        # lecture -> outputs fingerprint on the previous poll
+        self._finalized = {}           # lecture -> outputs fingerprint last finalized
+
+    def _agent(self) -> LectureNotesAgent:
+        # SQLite connections belong to the thread that opened them, so every worker gets its own agent
+        agent = getattr(self._local, 'agent', None)
+        if agent is None:
+            agent = LectureNotesAgent(self.source_folder, self.destination_folder, self.working_folder,
+                                      **self.agent_options)
+            self._local.agent = agent
+        return agent
+
+    def load_state(self):
+        """Pick up lectures prepared before the watcher started"""
+        for manifest in list_manifests(self.working_folder):
+            lecture_num = manifest['lecture_number']
+            self._outputs[lecture_num] = [os.path.basename(part['output_file']) for part in manifest['parts']]
+
+            # Notes newer than every part output are up to date
+            notes = os.path.join(self.destination_folder, f"lecture_notes_L{lecture_num:02d}_COMPREHENSIVE.md")
+            fingerprint = self._outputs_fingerprint(lecture_num, self._scan(self.working_folder))
+            if fingerprint and os.path.exists(notes) \
+                    and os.path.getmtime(notes) * 1e9 >= max(mtime for _, _, mtime in fingerprint):
+                self._finalized[lecture_num] = fingerprint
+
+    def run(self, max_polls: Optional[int] = None):
+        """Poll until interrupted (or max_polls rounds), then wait for running jobs"""
+        self.load_state()
+        print(f"Watching {self.source_folder}/ and {self.working_folder}/ (every {self.interval}s)")
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                self.poll()
+                polls += 1
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print("\nStopping watcher, waiting for running jobs...")
+        finally:
+            self._pool.shutdown(wait=True)
+            self._collect()
+
+    def poll(self) -> int:
+        """One round: collect finished jobs, then queue new ones; returns how many were queued"""
+        self._collect()
+        queued = 0
+
+        sources = {entry.path: _fingerprint(entry) for entry in self._scan(self.source_folder).values()
+                   if entry.name.endswith('.txt')}
+        for path, fingerprint in sorted(sources.items()):
+            settled = self._seen_sources.get(path) == fingerprint
+            if settled and self._prepared_sources.get(path) != fingerprint:
+                lecture_num = self._agent()._extract_lecture_number(os.path.basename(path))
+                if lecture_num not in self._busy:
+                    self._submit('prepare', lecture_num, fingerprint, self._prepare, path)
+                    queued += 1
+        self._seen_sources = sources
+
+        working = self._scan(self.working_folder)
+        for lecture_num in sorted(self._outputs):
+            fingerprint = self._outputs_fingerprint(lecture_num, working)
+            settled = fingerprint is not None and self._seen_outputs.get(lecture_num) == fingerprint
+            self._seen_outputs[lecture_num] = fingerprint
+            if settled and self._finalized.get(lecture_num) != fingerprint and lecture_num not in self._busy:
+                self._submit('finalize', lecture_num, fingerprint, self._finalize, lecture_num)
+                queued += 1
+
+        return queued
+
+    def _submit(self, kind: str, lecture_num: int, fingerprint, func, *args):
+        print(f"[watch] Queued {kind} of lecture {lecture_num:02d}")
+        self._busy.add(lecture_num)
+        future = self._pool.submit(func, *args)
+        self._futures[future] = (kind, lecture_num, fingerprint, args)
+
+    def _collect(self):
+        """Record finished jobs; only the polling thread touches the watcher state"""
+        for future in [future for future in self._futures if future.done()]:
+            kind, lecture_num, fingerprint, args = self._futures.pop(future)
+            self._busy.discard(lecture_num)
+            error = future.exception()
+            if error:
+                print(f"[watch] ✗ {kind} of lecture {lecture_num:02d} failed: {error}")
+                # Do not retry the same input until it changes
+                if kind == 'prepare':
+                    self._prepared_sources[args[0]] = fingerprint
+                else:
+                    self._finalized[lecture_num] = fingerprint
+                continue
+
+            if kind == 'prepare':
+                preparation = future.result()
+                self._prepared_sources[args[0]] = fingerprint
+                self._outputs[lecture_num] = [os.path.basename(info['output_file'])
+                                              for info in preparation['segment_files']]
+                print(f"[watch] ✓ Prepared lecture {lecture_num:02d}: "
+                      f"{len(preparation['reprocess_parts'])} part(s) to process")
+            else:
+                self._finalized[lecture_num] = fingerprint
+                print(f"[watch] ✓ Finalized lecture {lecture_num:02d}: {future.result().output_path}")
+
+    def _prepare(self, transcript_file: str) -> Dict[str, Any]:
+        return self._agent().prepare_lecture(transcript_file, incremental=True)
+
+    def _finalize(self, lecture_num: int):
+        manifest = load_manifest(self.working_folder, lecture_num)
+        if manifest is None:
+            raise FileNotFoundError(f"No manifest for lecture {lecture_num:02d}")
+        return self._agent().finalize_lecture(preparation_from_manifest(manifest))
+
+    def _outputs_fingerprint(self, lecture_num: int, working: Dict[str, os.DirEntry]):
+        """(name, size, mtime) of every part output, or None while any is missing"""
+        names = self._outputs.get(lecture_num)
+        if not names or any(name not in working for name in names):
+            return None
+        return tuple((name,) + _fingerprint(working[name]) for name in names)
+
+    @staticmethod
+    def _scan(folder: str) -> Dict[str, os.DirEntry]:
+        try:
+            with os.scandir(folder) as entries:
+                return {entry.name: entry for entry in entries if entry.is_file()}
+        except OSError:
+            return {}
@@ -7,6 +7,7 @@ No API key needed - uses Claude Code agents for processing
 import os
 import sys
 import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 
@@ -14,9 +15,11 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'agent'))
 
 from processor import LectureNotesAgent
+from segmenter import BoundaryAwareSegmenter
+from instrumentation import Instrumentation, JsonLinesSink
 
 
-def process_lecture_automated(transcript_file, agent):
+def process_lecture_automated(transcript_file, agent, incremental=False):
     """
     Process a complete lecture using Claude Code
     This prepares segments that need to be processed by Claude Code
@@ -26,23 +29,74 @@ def process_lecture_automated(transcript_file, agent):
     print(f"{'='*70}\n")
 
     # Step 1: Prepare lecture (create segment files)
-    preparation = agent.prepare_lecture(transcript_file)
+    preparation = agent.prepare_lecture(transcript_file, incremental=incremental)
 
     print(f"\n{'='*70}")
     print(f"PREPARATION COMPLETE")
     print(f"{'='*70}")
     print(f"Created {len(preparation['segment_files'])} segments")
     print(f"Segments are in: working/")
+    if incremental:
+        print(f"Parts needing (re)processing: {len(preparation['reprocess_parts'])}")
     print()
 
     return preparation
 
 
-def batch_process_lectures(source_folder='source_transcripts', destination_folder='outputs'):
-    """Prepare all transcripts for processing"""
+def prepare_summary(transcript_file, agent, incremental=False):
+    """Prepare one lecture and summarize the outcome; failures are isolated per file"""
+    try:
+        preparation = process_lecture_automated(transcript_file, agent, incremental)
+        return {
+            'file': transcript_file,
+            'status': 'PREPARED',
+            'lecture_num': preparation['lecture_number'],
+            'segments': len(preparation['segment_files']),
+            'reprocess_parts': preparation['reprocess_parts']
+        }
+    except Exception as e:
+        print(f"\n✗ Failed to prepare {os.path.basename(transcript_file)}: {e}")
+        return {
+            'file': transcript_file,
+            'status': 'FAILED',
+            'error': str(e)
+        }
 
-    # Initialize agent
-    agent = LectureNotesAgent(source_folder, destination_folder, 'working')
+
+def agent_options(metrics=None, overlap=0):
+    """Segmenter and instrumentation shared by every agent of a batch"""
+    instrumentation = Instrumentation()
+    if metrics:
+        instrumentation.add_hook(JsonLinesSink(metrics))
+    return {
+        'segmenter': BoundaryAwareSegmenter(overlap_tokens=overlap),
+        'instrumentation': instrumentation
+    }
+
+
+def build_agent(source_folder, destination_folder, metrics=None, overlap=0):
+    """Agent for batch preparation, writing phase events to metrics when given"""
+    return LectureNotesAgent(source_folder, destination_folder, 'working', **agent_options(metrics, overlap))
+
+
+# Each pool worker builds its own agent once
+_worker_agent = None
+_worker_incremental = False
+
+
+def _init_worker(source_folder, destination_folder, incremental, metrics=None, overlap=0):
+    global _worker_agent, _worker_incremental
+    _worker_agent = build_agent(source_folder, destination_folder, metrics, overlap)
+    _worker_incremental = incremental
+
+
+def _prepare_in_worker(transcript_file):
+    return prepare_summary(transcript_file, _worker_agent, _worker_incremental)
+
+
+def batch_process_lectures(source_folder='source_transcripts', destination_folder='outputs', jobs=1,
+                           incremental=False, metrics=None, overlap=0):
+    """Prepare all transcripts for processing, optionally across a process pool"""
 
     # Get all transcript files
     transcript_files = sorted(glob.glob(f"{source_folder}/*.txt"))
@@ -55,24 +109,29 @@ def batch_process_lectures(source_folder='source_transcripts', destination_folde
     print(f"Found {len(transcript_files)} transcripts to process")
     print("="*70)
 
-    preparations = []
-
-    for i, transcript_file in enumerate(transcript_files, 1):
-        try:
-            preparation = process_lecture_automated(transcript_file, agent)
-            preparations.append({
-                'file': transcript_file,
-                'status': 'PREPARED',
-                'lecture_num': preparation['lecture_number'],
-                'segments': len(preparation['segment_files'])
-            })
-        except Exception as e:
-            preparations.append({
-                'file': transcript_file,
-                'status': 'FAILED',
-                'error': str(e)
-            })
-            print(f"\n✗ Failed to prepare {os.path.basename(transcript_file)}: {e}")
+    if jobs > 1 and len(transcript_files) > 1:
+        preparations = [None] * len(transcript_files)
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(source_folder, destination_folder, incremental, metrics, overlap)) as pool:
+            futures = {
+                pool.submit(_prepare_in_worker, transcript_file): i
+                for i, transcript_file in enumerate(transcript_files)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    preparations[i] = future.result()
+                except Exception as e:
+                    # Worker process died before it could report
+                    preparations[i] = {'file': transcript_files[i], 'status': 'FAILED', 'error': str(e)}
+                print(f"[{done}/{len(transcript_files)}] {preparations[i]['status']}: "
+                      f"{os.path.basename(transcript_files[i])}")
+    else:
+        # Initialize agent
+        agent = build_agent(source_folder, destination_folder, metrics, overlap)
+        preparations = [prepare_summary(transcript_file, agent, incremental)
+                        for transcript_file in transcript_files]
 
     # Generate summary
     print(f"\n{'='*70}")
@@ -82,6 +141,8 @@ def batch_process_lectures(source_folder='source_transcripts', destination_folde
     for prep in preparations:
         if prep['status'] == 'PREPARED':
             print(f"✓ Lecture {prep['lecture_num']:02d}: {prep['segments']} segments prepared")
+            if incremental and prep['reprocess_parts']:
+                print(f"    Needs (re)processing: parts {', '.join(str(p) for p in prep['reprocess_parts'])}")
         else:
             print(f"✗ {os.path.basename(prep['file'])}: Failed")
 
@@ -99,6 +160,61 @@ def batch_process_lectures(source_folder='source_transcripts', destination_folde
     return preparations
 
 
+def pipeline_lectures(backend, source_folder='source_transcripts', destination_folder=None, working_folder=None,
+                      workers=4, queue_size=2, incremental=False, metrics=None, overlap=0, latency=0.0):
+    """
+    Prepare, process and finalize all transcripts as a pipeline, lectures overlapping across stages.
+    Folders left unset are working/ and outputs/, or stub_run/ for a stand-in backend.
+    """
+    from pipeline import LecturePipeline, STAGES
+    from segment_processor import create_processor, run_folders
+
+    transcript_files = sorted(glob.glob(f"{source_folder}/*.txt"))
+    if not transcript_files:
+        print(f"No transcript files found in {source_folder}/")
+        return []
+
+    print(f"Found {len(transcript_files)} transcripts to run through the pipeline")
+    print("="*70)
+
+    processor = create_processor(backend, **({'latency': latency} if backend == 'stub' else {}))
+    working_folder, destination_folder = run_folders(processor, working_folder, destination_folder)
+    print(f"Working folder: {working_folder}")
+    print(f"Output folder: {destination_folder}")
+    pipeline = LecturePipeline(source_folder, destination_folder, processor, working_folder, workers=workers,
+                               queue_size=queue_size, incremental=incremental,
+                               agent_options=agent_options(metrics, overlap))
+
+    def report(record):
+        name = os.path.basename(record['file'])
+        status = 'FAILED' if record['error'] else 'FINISHED'
+        print(f"[{record['finished_at']:.2f}s] {status}: {name}")
+
+    records = pipeline.run(transcript_files, on_finished=report)
+
+    print(f"\n{'='*70}")
+    print("PIPELINE SUMMARY")
+    print(f"{'='*70}\n")
+
+    for record in records:
+        if record['error']:
+            print(f"✗ {os.path.basename(record['file'])}: {record['error']}")
+        else:
+            print(f"✓ Lecture {record['lecture_num']:02d}: {record['segments']} segments, "
+                  f"quality {record['result'].quality_score:.0f}% -> {record['result'].output_path}")
+
+    finished = [record['finished_at'] for record in records if not record['error']]
+    busiest = max(STAGES, key=lambda stage: pipeline.stage_seconds[stage])
+    print(f"\nStage busy time: " + ', '.join(f"{stage} {pipeline.stage_seconds[stage]:.2f}s" for stage in STAGES))
+    print(f"Sum of stages: {sum(pipeline.stage_seconds.values()):.2f}s, slowest stage: {busiest}")
+    if finished:
+        print(f"First lecture finished after {min(finished):.2f}s")
+    print(f"Total: {pipeline.elapsed:.2f}s for {len(records)} lectures")
+    print()
+
+    return records
+
+
 def main():
     """Main entry point"""
     import argparse
@@ -113,15 +229,89 @@ def main():
     )
     parser.add_argument(
         '--output',
-        default='outputs',
-        help='Destination folder for output files (default: outputs)'
+        default=None,
+        help='Destination folder for output files (default: outputs, stub_run/outputs for --backend stub)'
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='Number of lectures to prepare in parallel (default: 1)'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only rewrite segments whose content changed since the last preparation'
+    )
+    parser.add_argument(
+        '--overlap',
+        type=int,
+        default=0,
+        metavar='TOKENS',
+        help='Open each segment with up to TOKENS of context from the previous one (default: 0, no overlap)'
+    )
+    parser.add_argument(
+        '--metrics',
+        metavar='PATH',
+        help='Append phase timing events to PATH as JSON lines (shared by all workers)'
+    )
+
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='Prepare, process and finalize as overlapping stages instead of preparing only'
+    )
+    parser.add_argument(
+        '--backend',
+        help="Segment processing backend for --pipeline, required with it ('stub' is a stand-in for testing)"
+    )
+    parser.add_argument(
+        '--working',
+        default=None,
+        help='Working folder for --pipeline (default: working, stub_run/working for --backend stub)'
+    )
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=4,
+        help='Segments processed at the same time with --pipeline (default: 4)'
+    )
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=2,
+        help='Lectures waiting between two pipeline stages (default: 2)'
+    )
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.0,
+        metavar='SECONDS',
+        help='Simulated round trip per segment for the stub backend (default: 0)'
     )
 
     args = parser.parse_args()
+    if args.pipeline:
+        from segment_processor import BACKENDS
+        if not args.backend:
+            parser.error('--pipeline requires --backend')
+        if args.backend not in BACKENDS:
+            parser.error(f"unknown backend '{args.backend}' (available: {', '.join(sorted(BACKENDS))})")
 
     # Resolve paths
     source_folder = os.path.abspath(args.source)
-    output_folder = os.path.abspath(args.output)
+    os.makedirs(source_folder, exist_ok=True)
+
+    if args.pipeline:
+        print("Lecture Notes Batch Processor (Claude Code)")
+        print("="*70)
+        print(f"Source folder: {source_folder}")
+        pipeline_lectures(args.backend, source_folder, args.output, args.working, workers=args.workers,
+                          queue_size=args.queue_size, incremental=args.incremental, metrics=args.metrics,
+                          overlap=args.overlap, latency=args.latency)
+        return
+
+    output_folder = os.path.abspath(args.output or 'outputs')
 
     print("Lecture Notes Batch Processor (Claude Code)")
     print("="*70)
@@ -130,12 +320,12 @@ def main():
     print("="*70)
 
     # Create folders if they don't exist
-    os.makedirs(source_folder, exist_ok=True)
     os.makedirs(output_folder, exist_ok=True)
     os.makedirs('working', exist_ok=True)
 
     # Process all lectures
-    batch_process_lectures(source_folder, output_folder)
+    batch_process_lectures(source_folder, output_folder, jobs=args.jobs, incremental=args.incremental,
+                           metrics=args.metrics, overlap=args.overlap)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the prepare/finalize pipeline
+Generates synthetic Arabic lecture transcripts and times each phase
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+# Add agent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'agent'))
+
+from processor import LectureNotesAgent
+from merger import MergeWriter
+from quality_checker import QualityChecker, ValidationError
+
+
+HADITH_ARABIC = [
+    "حَدَّثَنَا الْحُمَيْدِيُّ عَبْدُ اللَّهِ بْنُ الزُّبَيْرِ قَالَ حَدَّثَنَا سُفْيَانُ قَالَ حَدَّثَنَا يَحْيَى بْنُ سَعِيدٍ الأَنْصَارِيُّ",
+    "قَالَ سَمِعْتُ رَسُولَ اللَّهِ صلى الله عليه وسلم يَقُولُ إِنَّمَا الأَعْمَالُ بِالنِّيَّاتِ وَإِنَّمَا لِكُلِّ امْرِئٍ مَا نَوَى",
+    "فَمَنْ كَانَتْ هِجْرَتُهُ إِلَى اللَّهِ وَرَسُولِهِ فَهِجْرَتُهُ إِلَى اللَّهِ وَرَسُولِهِ",
+]
+HADITH_ENGLISH = [
+    "Al-Humaidi 'Abdullah bin Az-Zubair narrated to us, saying: Sufyan narrated to us.",
+    "I heard the Messenger of Allah say: **\"Actions are but by intentions.\"**",
+    "**\"So whoever's migration was for Allah and His Messenger, then his migration was for Allah and His Messenger.\"**",
+]
+EXPLANATION_ARABIC = [
+    "هذا الحديث العظيم يعتبر من أصول الدين، قال بعض العلماء إن الدين يدور على ثلاثة أحاديث",
+    "والنية محلها القلب، لا يشترط التلفظ بها، وهذا من الأمور المهمة في عباداتنا اليومية",
+    "[سؤال طالب]: يا شيخ، ما معنى الأعمال هنا؟",
+]
+EXPLANATION_ENGLISH = [
+    "This great hadith is considered one of the foundations of the religion.",
+    "The place of intention is the heart; it is not required to verbalize it.",
+    "[Student question]: O Sheikh, what is the meaning of \"actions\" here?",
+]
+
+
+def format_time(seconds):
+    """Seconds as MM:SS or H:MM:SS"""
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def generate_transcript(path, hours, seed=0, seconds_per_timestamp=20):
+    """Write a synthetic transcript of the given length with chapter and hadith markers"""
+    rng = random.Random(seed)
+    total_seconds = int(hours * 3600)
+    chapter = 1
+    hadith = 1
+
+    with open(path, 'w', encoding='utf-8') as f:
+        t = 0
+        while t < total_seconds:
+            ts = format_time(t)
+            roll = rng.random()
+            if roll < 0.01:
+                f.write(f"({ts}) باب ما جاء في {rng.choice(['النية', 'الوحي', 'الإيمان', 'العلم'])} | Chapter {chapter}\n\n")
+                chapter += 1
+            elif roll < 0.05:
+                f.write(f"({ts}) الحديث رقم {hadith} | Hadith {hadith}\n\n")
+                hadith += 1
+            elif roll < 0.45:
+                i = rng.randrange(len(HADITH_ARABIC))
+                f.write(f"({ts}) {HADITH_ARABIC[i]}\n\n{HADITH_ENGLISH[i]}\n\n")
+            else:
+                i = rng.randrange(len(EXPLANATION_ARABIC))
+                f.write(f"({ts}) {EXPLANATION_ARABIC[i]}\n\n{EXPLANATION_ENGLISH[i]}\n\n")
+            t += rng.randint(seconds_per_timestamp // 2, seconds_per_timestamp * 2)
+
+
+def write_part_outputs(segment_files):
+    """Stand-in for processed parts: a bilingual header followed by the segment text"""
+    for info in segment_files:
+        with open(info['segment_file'], 'r', encoding='utf-8') as src, \
+                open(info['output_file'], 'w', encoding='utf-8') as dst:
+            dst.write(f"## الجزء {info['part_number']} | Part {info['part_number']}\n\n")
+            shutil.copyfileobj(src, dst)
+
+
+def measure(func, trace_memory):
+    """Run func once untraced for timing, then once under tracemalloc for peak memory"""
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        result = func()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result, seconds, peak
+
+
+def phase_stats(seconds, peak, size_bytes, lines):
+    return {
+        'seconds': round(seconds, 6),
+        'mb_per_s': round(size_bytes / (1024 * 1024) / seconds, 3) if seconds else None,
+        'lines_per_s': round(lines / seconds, 1) if seconds else None,
+        'peak_bytes': peak
+    }
+
+
+def bench_size(hours, workdir, trace_memory=True, seed=0):
+    """Benchmark every phase for one synthetic transcript length"""
+    source = os.path.join(workdir, 'source')
+    working = os.path.join(workdir, 'working')
+    outputs = os.path.join(workdir, 'outputs')
+    os.makedirs(source, exist_ok=True)
+
+    transcript = os.path.join(source, 'lecture_01.txt')
+    generate_transcript(transcript, hours, seed)
+    size_bytes = os.path.getsize(transcript)
+
+    # Caches and corpus indexes off: every phase does its full work and nothing else
+    agent = LectureNotesAgent(source, outputs, working, use_cache=False,
+                              index_corpus=False, search_notes=False)
+    phases = {}
+
+    analysis, seconds, peak = measure(lambda: agent.analyze_transcript(transcript), trace_memory)
+    lines = analysis['line_count']
+    phases['analyze'] = phase_stats(seconds, peak, size_bytes, lines)
+
+    plan, seconds, peak = measure(lambda: agent.create_segmentation_plan(analysis), trace_memory)
+    phases['plan'] = phase_stats(seconds, peak, size_bytes, lines)
+
+    segment_files, seconds, peak = measure(
+        lambda: agent.create_segment_files(transcript, plan, analysis), trace_memory)
+    phases['write_segments'] = phase_stats(seconds, peak, size_bytes, lines)
+
+    write_part_outputs(segment_files)
+    merged_path = os.path.join(outputs, 'merged.md')
+    merged_bytes = sum(os.path.getsize(info['output_file']) for info in segment_files)
+
+    def merge():
+        with open(merged_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            return agent.write_merged(MergeWriter(f), segment_files, 1)
+
+    scan, seconds, peak = measure(merge, trace_memory)
+    phases['merge'] = phase_stats(seconds, peak, merged_bytes, scan.line_count)
+
+    with open(merged_path, 'r', encoding='utf-8') as f:
+        document = f.read()
+
+    def validate():
+        checker = QualityChecker(source_timestamps=analysis['timestamp_ranges'])
+        try:
+            checker.validate(document)
+        except ValidationError:
+            pass
+
+    _, seconds, peak = measure(validate, trace_memory)
+    phases['validate'] = phase_stats(seconds, peak, merged_bytes, scan.line_count)
+
+    return {
+        'hours': hours,
+        'transcript_bytes': size_bytes,
+        'transcript_lines': lines,
+        'timestamps': len(analysis['timestamp_ranges']),
+        'hadith': len(analysis['hadith_numbers']),
+        'chapters': len(analysis['chapters']),
+        'parts': len(plan),
+        'merged_bytes': merged_bytes,
+        'phases': phases
+    }
+
+
+def main():
+    """Main entry point"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark the prepare/finalize pipeline on synthetic transcripts'
+    )
+    parser.add_argument(
+        '--hours',
+        type=float,
+        nargs='+',
+        default=[1, 3, 10],
+        help='Transcript lengths to generate, in hours (default: 1 3 10)'
+    )
+    parser.add_argument(
+        '--output',
+        default='bench_results.json',
+        help='Where to write the JSON results (default: bench_results.json)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Random seed for transcript generation (default: 0)'
+    )
+    parser.add_argument(
+        '--no-memory',
+        action='store_true',
+        help='Skip the tracemalloc pass that records peak memory per phase'
+    )
+    parser.add_argument(
+        '--keep',
+        action='store_true',
+        help='Keep the generated working directories'
+    )
+
+    args = parser.parse_args()
+
+    results = []
+    for hours in args.hours:
+        workdir = tempfile.mkdtemp(prefix=f'bench_{hours}h_')
+        try:
+            print(f"Benchmarking {hours}h transcript...")
+            result = bench_size(hours, workdir, trace_memory=not args.no_memory, seed=args.seed)
+            results.append(result)
+            for name, stats in result['phases'].items():
+                print(f"  {name:15s} {stats['seconds']:9.4f}s  {stats['mb_per_s'] or 0:9.2f} MB/s")
+        finally:
+            if args.keep:
+                print(f"  Kept: {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'results': results
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Regression check for transcript analysis
+Compares the single-pass analysis with the original per-pattern regex extraction
+"""
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+
+# Add agent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'agent'))
+
+from processor import LectureNotesAgent
+from bench_pipeline import generate_transcript
+
+
+# Lines the combined tokenizer once got wrong: hadith mentions inside chapter
+# titles and behind و/ف/ب prefixes
+EDGE_CASES = """(0:10) باب بدء الوحي حديث رقم 1
+(0:20) الحديث رقم 2 | Hadith 2
+(0:30) وحديث 3 كذلك
+(0:40) فالحديث 4 وبالحديث 5 ثم hadith number 6
+(0:50-1:05) كتاب الإيمان وفيه الحديث 7
+"""
+
+
+def baseline_analysis(content):
+    """The fields analyze_transcript produced with one re.findall per pattern"""
+    clocks = re.findall(r'(\d{1,2}:\d{2}(?::\d{2})?)', content)
+
+    hadith_numbers = set()
+    for pattern in (r'(?:الحديث|حديث)\s+(?:رقم\s+)?(\d+)', r'Hadith\s+(?:number\s+)?(\d+)'):
+        hadith_numbers.update(int(m) for m in re.findall(pattern, content, re.IGNORECASE))
+
+    return {
+        'line_count': len(content.split('\n')),
+        'char_count': len(content),
+        'duration': clocks[-1] if clocks else "Unknown",
+        'hadith_numbers': sorted(hadith_numbers),
+        'timestamp_ranges': re.findall(
+            r'\((\d{1,2}:\d{2}(?::\d{2})?(?:-\d{1,2}:\d{2}(?::\d{2})?)?)\)', content),
+    }
+
+
+def check(path, agent):
+    """Field names whose value differs from the baseline"""
+    with open(path, 'r', encoding='utf-8') as f:
+        expected = baseline_analysis(f.read())
+    with redirect_stdout(open(os.devnull, 'w')):
+        analysis = agent.analyze_transcript(path)
+
+    mismatches = []
+    for field, value in expected.items():
+        if analysis[field] != value:
+            mismatches.append(field)
+            print(f"    {field}: expected {str(value)[:80]}, got {str(analysis[field])[:80]}")
+    return mismatches
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='check_analysis_')
+    try:
+        edge_path = os.path.join(workdir, 'edge_cases.txt')
+        with open(edge_path, 'w', encoding='utf-8') as f:
+            f.write(EDGE_CASES)
+        synthetic_path = os.path.join(workdir, 'synthetic.txt')
+        generate_transcript(synthetic_path, 1)
+
+        transcripts = [edge_path, synthetic_path,
+                       os.path.join(os.path.dirname(__file__), '..', 'example_transcript.txt')]
+
+        with redirect_stdout(open(os.devnull, 'w')):
+            agent = LectureNotesAgent(workdir, os.path.join(workdir, 'out'), os.path.join(workdir, 'work'),
+                                      use_cache=False, index_corpus=False, search_notes=False)
+
+        failed = 0
+        for path in transcripts:
+            mismatches = check(path, agent)
+            print(f"{'✗' if mismatches else '✓'} {os.path.basename(path)}")
+            failed += bool(mismatches)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failed:
+        print(f"\n{failed} transcript(s) differ from the baseline analysis")
+        sys.exit(1)
+    print("\nAnalysis matches the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,24 +5,37 @@ Works within Claude Code environment - no API key needed
 """
 
 import os
+import re
 import sys
+import glob
+import time
 
 # Add agent directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'agent'))
 
 from processor import LectureNotesAgent
+from segmenter import BoundaryAwareSegmenter
+from instrumentation import Instrumentation, JsonLinesSink
+from manifest import load_manifest, list_manifests, existing_files, preparation_from_manifest
+from records import SegmentFiles, TranscriptAnalysis
 
 
-def prepare_transcript(transcript_file, agent):
+def prepare_transcript(transcript_file, agent, incremental=False):
     """Prepare a transcript for processing"""
     print(f"\n{'='*70}")
     print(f"PREPARING: {os.path.basename(transcript_file)}")
     print(f"{'='*70}\n")
 
-    preparation = agent.prepare_lecture(transcript_file)
+    preparation = agent.prepare_lecture(transcript_file, incremental=incremental)
 
     print(f"\n✓ Preparation complete!")
     print(f"  Created {len(preparation['segment_files'])} segment files in working/")
+    if incremental:
+        reprocess = preparation['reprocess_parts']
+        if reprocess:
+            print(f"  Parts needing (re)processing: {', '.join(str(p) for p in reprocess)}")
+        else:
+            print(f"  No parts changed - existing outputs are still valid")
     print(f"  Ready for processing\n")
 
     return preparation
@@ -39,6 +52,104 @@ def finalize_lecture(preparation, agent):
     return result
 
 
+def load_preparation(lecture_num, agent, working_folder='working'):
+    """Preparation data for a lecture, read from its manifest when one exists"""
+    manifest = load_manifest(working_folder, lecture_num)
+    if manifest:
+        return preparation_from_manifest(manifest)
+
+    # Lectures prepared before manifests existed: rebuild from the files on disk
+    segments = glob.glob(os.path.join(working_folder, f"L{lecture_num:02d}_PART*_segment.txt"))
+    if not segments:
+        return None
+
+    transcript_matches = glob.glob(f"source_transcripts/corrected_{lecture_num}*.txt")
+    if not transcript_matches:
+        print(f"Warning: Source transcript not found, using generic name")
+        transcript_file = f"lecture_{lecture_num:02d}.txt"
+    else:
+        transcript_file = transcript_matches[0]
+
+    segment_files = []
+    part_num = 1
+    while True:
+        prefix = os.path.join(working_folder, f"L{lecture_num:02d}_PART{part_num}")
+        if not os.path.exists(f"{prefix}_segment.txt"):
+            break
+
+        segment_files.append(SegmentFiles(part_num, f"{prefix}_segment.txt", f"{prefix}_instructions.md",
+                                          f"{prefix}_output.md"))
+        part_num += 1
+
+    # Cached analysis (recomputed only if the transcript changed)
+    analysis = agent.load_analysis(transcript_file)[0] if os.path.exists(transcript_file) else TranscriptAnalysis()
+
+    return {
+        'transcript_file': transcript_file,
+        'lecture_number': lecture_num,
+        'segment_files': segment_files,
+        'analysis': analysis
+    }
+
+
+def segment_status(working_folder='working'):
+    """Per-lecture part status from the manifests and a single listing of the working folder"""
+    names = existing_files(working_folder)
+    lectures = {}
+
+    for manifest in list_manifests(working_folder):
+        lectures[manifest['lecture_number']] = [
+            {
+                'part': part['part_number'],
+                'status': '✓ Done' if os.path.basename(part['output_file']) in names else '○ Pending',
+                'segment': part['segment_file'],
+                'output': part['output_file']
+            }
+            for part in manifest['parts']
+        ]
+
+    # Segments prepared before manifests existed
+    manifest_lectures = set(lectures)
+    for name in names:
+        match = re.match(r'L(\d+)_PART(\d+)_segment\.txt$', name)
+        if not match or int(match.group(1)) in manifest_lectures:
+            continue
+
+        lecture_num = int(match.group(1))
+        part_num = int(match.group(2))
+        output_name = f"L{lecture_num:02d}_PART{part_num}_output.md"
+
+        lectures.setdefault(lecture_num, []).append({
+            'part': part_num,
+            'status': '✓ Done' if output_name in names else '○ Pending',
+            'segment': os.path.join(working_folder, name),
+            'output': os.path.join(working_folder, output_name)
+        })
+
+    return lectures
+
+
+def print_throughput(runs, elapsed):
+    """Per-lecture stage timings and end-to-end throughput of a run"""
+    print(f"\n{'='*70}")
+    print("THROUGHPUT")
+    print(f"{'='*70}")
+    for run in runs:
+        timings = run['timings']
+        status = f"{run['result'].quality_score:.0f}%" if run['result'] else f"{run['failed']} failed"
+        print(f"  Lecture {run['lecture_number']:02d}: {run['processed']}/{run['parts']} parts processed, "
+              f"prepare {timings['prepare']:.2f}s, process {timings['process']:.2f}s, "
+              f"finalize {timings['finalize']:.2f}s ({status})")
+
+    parts = sum(run['processed'] for run in runs)
+    megabytes = sum(run['bytes'] for run in runs) / 1e6
+    finished = sum(1 for run in runs if run['result'])
+    print(f"\n  {finished}/{len(runs)} lectures finished in {elapsed:.2f}s")
+    if elapsed > 0:
+        print(f"  {parts / elapsed:.1f} parts/s, {megabytes / elapsed:.2f} MB/s of transcript")
+    print()
+
+
 def main():
     """Main entry point"""
     import argparse
@@ -47,12 +158,19 @@ def main():
         description='Prepare and finalize lecture transcripts for Claude Code processing'
     )
 
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='Append phase timing events to PATH as JSON lines')
+
     subparsers = parser.add_subparsers(dest='command', help='Command to run')
 
     # Prepare command
     prepare_parser = subparsers.add_parser('prepare', help='Prepare transcript(s) for processing')
     prepare_parser.add_argument('transcript', nargs='?', help='Transcript file to prepare (optional)')
     prepare_parser.add_argument('--all', action='store_true', help='Prepare all transcripts in source_transcripts/')
+    prepare_parser.add_argument('--incremental', action='store_true',
+                                help='Only rewrite segments whose content changed since the last preparation')
+    prepare_parser.add_argument('--overlap', type=int, default=0, metavar='TOKENS',
+                                help='Open each segment with up to TOKENS of context from the previous one')
 
     # Finalize command
     finalize_parser = subparsers.add_parser('finalize', help='Finalize processed lecture')
@@ -61,19 +179,81 @@ def main():
     # List command
     list_parser = subparsers.add_parser('list', help='List segments ready for processing')
 
+    # Lookup command
+    lookup_parser = subparsers.add_parser('lookup', help='Find where a hadith or chapter is taught')
+    lookup_group = lookup_parser.add_mutually_exclusive_group(required=True)
+    lookup_group.add_argument('--hadith', type=int, metavar='NUMBER', help='Hadith number')
+    lookup_group.add_argument('--chapter', metavar='TEXT', help='Text contained in the chapter title')
+
+    # Watch command
+    watch_parser = subparsers.add_parser('watch', help='Prepare and finalize lectures automatically as files land')
+    watch_parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls (default: 2)')
+    watch_parser.add_argument('--jobs', '-j', type=int, default=2,
+                              help='Lectures prepared or finalized at the same time (default: 2)')
+
+    # Search command
+    search_parser = subparsers.add_parser('search', help='Full-text search over finalized notes')
+    search_parser.add_argument('query', nargs='+', help='Arabic and/or English words to find')
+    search_parser.add_argument('--limit', type=int, default=20, help='Maximum number of results (default: 20)')
+
+    # Run command
+    run_parser = subparsers.add_parser('run', help='Prepare, process and finalize in one pass with a backend')
+    run_parser.add_argument('transcript', nargs='?', help='Transcript file to run (optional)')
+    run_parser.add_argument('--all', action='store_true', help='Run all transcripts in source_transcripts/')
+    run_parser.add_argument('--backend', required=True,
+                            help="Segment processing backend ('stub' is a deterministic stand-in for testing)")
+    run_parser.add_argument('--working', default=None,
+                            help='Working folder (default: working/, stub_run/working/ for the stub)')
+    run_parser.add_argument('--output', default=None,
+                            help='Notes folder (default: outputs/, stub_run/outputs/ for the stub)')
+    run_parser.add_argument('--workers', '-w', type=int, default=4,
+                            help='Segments processed at the same time (default: 4)')
+    run_parser.add_argument('--concurrency', type=int, default=None,
+                            help='Backend limit on calls in flight (default: backend setting)')
+    run_parser.add_argument('--rate', type=float, default=None, metavar='PER_SECOND',
+                            help='Backend limit on calls started per second')
+    run_parser.add_argument('--latency', type=float, default=0.0, metavar='SECONDS',
+                            help='Simulated round trip per segment (stub backend)')
+    run_parser.add_argument('--incremental', action='store_true',
+                            help='Only rewrite and reprocess segments whose content changed')
+    run_parser.add_argument('--overlap', type=int, default=0, metavar='TOKENS',
+                            help='Open each segment with up to TOKENS of context from the previous one')
+
     args = parser.parse_args()
 
+    instrumentation = Instrumentation()
+    if args.metrics:
+        instrumentation.add_hook(JsonLinesSink(args.metrics))
+
+    # A run's backend decides its folders (stand-ins write to scratch folders), so resolve them first
+    working, output = 'working', 'outputs'
+    if args.command == 'run':
+        from segment_processor import create_processor, run_folders
+
+        options = {'latency': args.latency} if args.backend == 'stub' else {}
+        if args.concurrency:
+            options['max_concurrency'] = args.concurrency
+        if args.rate:
+            options['rate_per_second'] = args.rate
+        try:
+            processor = create_processor(args.backend, **options)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        working, output = run_folders(processor, args.working, args.output)
+
     # Initialize agent
     agent = LectureNotesAgent(
         source_folder='source_transcripts',
-        destination_folder='outputs',
-        working_folder='working'
+        destination_folder=output,
+        working_folder=working,
+        segmenter=BoundaryAwareSegmenter(overlap_tokens=getattr(args, 'overlap', 0)),
+        instrumentation=instrumentation
     )
 
     if args.command == 'prepare':
         if args.all:
             # Prepare all transcripts
-            import glob
             transcripts = sorted(glob.glob('source_transcripts/*.txt'))
             if not transcripts:
                 print("No transcript files found in source_transcripts/")
@@ -81,7 +261,7 @@ def main():
 
             preparations = []
             for transcript in transcripts:
-                prep = prepare_transcript(transcript, agent)
+                prep = prepare_transcript(transcript, agent, args.incremental)
                 preparations.append(prep)
 
             print(f"\n{'='*70}")
@@ -96,61 +276,18 @@ def main():
             if not os.path.exists(args.transcript):
                 print(f"Error: File not found: {args.transcript}")
                 return
-            prepare_transcript(args.transcript, agent)
+            prepare_transcript(args.transcript, agent, args.incremental)
         else:
             print("Error: Specify a transcript file or use --all")
             parser.print_help()
 
     elif args.command == 'finalize':
-        # Find preparation data for this lecture
-        import glob
-        import json
-
-        # Look for segment files
-        segment_pattern = f"working/L{args.lecture_num:02d}_PART*_segment.txt"
-        segments = glob.glob(segment_pattern)
-
-        if not segments:
+        preparation = load_preparation(args.lecture_num, agent)
+        if preparation is None:
             print(f"Error: No segments found for lecture {args.lecture_num:02d}")
             print(f"Run 'python process_helper.py prepare' first")
             return
 
-        # Reconstruct preparation data
-        transcript_file = f"source_transcripts/corrected_{args.lecture_num}*.txt"
-        transcript_matches = glob.glob(transcript_file)
-
-        if not transcript_matches:
-            print(f"Warning: Source transcript not found, using generic name")
-            transcript_file = f"lecture_{args.lecture_num:02d}.txt"
-        else:
-            transcript_file = transcript_matches[0]
-
-        # Build segment files list
-        segment_files = []
-        part_num = 1
-        while True:
-            seg_file = f"working/L{args.lecture_num:02d}_PART{part_num}_segment.txt"
-            if not os.path.exists(seg_file):
-                break
-
-            segment_files.append({
-                'part_number': part_num,
-                'segment_file': seg_file,
-                'instruction_file': f"working/L{args.lecture_num:02d}_PART{part_num}_instructions.md",
-                'output_file': f"working/L{args.lecture_num:02d}_PART{part_num}_output.md"
-            })
-            part_num += 1
-
-        # Quick analysis
-        analysis = agent.analyze_transcript(transcript_file) if os.path.exists(transcript_file) else {'timestamp_ranges': []}
-
-        preparation = {
-            'transcript_file': transcript_file,
-            'lecture_number': args.lecture_num,
-            'segment_files': segment_files,
-            'analysis': analysis
-        }
-
         result = finalize_lecture(preparation, agent)
 
         print(f"\n✓ Lecture {args.lecture_num:02d} finalized successfully!")
@@ -159,39 +296,12 @@ def main():
 
     elif args.command == 'list':
         # List all pending segments
-        import glob
-
-        segments = glob.glob('working/*_segment.txt')
-        if not segments:
+        lectures = segment_status('working')
+        if not lectures:
             print("No segments found in working/")
             print("Run 'python process_helper.py prepare' first")
             return
 
-        # Group by lecture
-        lectures = {}
-        for seg in segments:
-            basename = os.path.basename(seg)
-            # Extract L##_PART#
-            import re
-            match = re.match(r'L(\d+)_PART(\d+)_segment\.txt', basename)
-            if match:
-                lecture_num = int(match.group(1))
-                part_num = int(match.group(2))
-
-                if lecture_num not in lectures:
-                    lectures[lecture_num] = []
-
-                # Check if output exists
-                output_file = f'working/L{lecture_num:02d}_PART{part_num}_output.md'
-                status = '✓ Done' if os.path.exists(output_file) else '○ Pending'
-
-                lectures[lecture_num].append({
-                    'part': part_num,
-                    'status': status,
-                    'segment': seg,
-                    'output': output_file
-                })
-
         print("\n" + "="*70)
         print("SEGMENTS STATUS")
         print("="*70 + "\n")
@@ -206,6 +316,82 @@ def main():
                 print(f"  Part {part_info['part']}: {part_info['status']}")
             print()
 
+    elif args.command == 'lookup':
+        if args.hadith is not None:
+            label = f"Hadith {args.hadith}"
+            matches = agent.corpus_index.find_hadith(args.hadith)
+        else:
+            label = f"Chapter '{args.chapter}'"
+            matches = agent.corpus_index.find_chapter(args.chapter)
+
+        if not matches:
+            print(f"{label}: not found in any prepared lecture")
+            return
+
+        print(f"\n{label}: {len(matches)} occurrence(s)\n")
+        for match in matches:
+            where = f"Lecture {match['lecture']:02d}, Part {match['part']}"
+            start, end = match['start_timestamp'], match['end_timestamp']
+            when = f" at ({start}-{end})" if start and end != start else f" at ({start})" if start else ""
+            title = f" - {match['title']}" if 'title' in match else ""
+            print(f"  {where}{when}, transcript line {match['line']}{title}")
+            if match['output_file']:
+                print(f"    Notes: {match['output_file']}")
+        print()
+
+    elif args.command == 'watch':
+        from watcher import LectureWatcher
+
+        watcher = LectureWatcher('source_transcripts', 'outputs', 'working', jobs=args.jobs,
+                                 interval=args.interval, agent_options={
+                                     'segmenter': agent.segmenter,
+                                     'instrumentation': instrumentation
+                                 })
+        watcher.run()
+
+    elif args.command == 'run':
+        if args.all:
+            transcripts = sorted(glob.glob('source_transcripts/*.txt'))
+        elif args.transcript:
+            transcripts = [args.transcript]
+        else:
+            print("Error: Specify a transcript file or use --all")
+            return
+        missing = [path for path in transcripts if not os.path.exists(path)]
+        if not transcripts or missing:
+            print(f"Error: File not found: {missing[0] if missing else 'source_transcripts/*.txt'}")
+            return
+
+        if (working, output) != ('working', 'outputs'):
+            print(f"Writing to {working}/ and {output}/")
+
+        runs = []
+        start = time.perf_counter()
+        for transcript in transcripts:
+            runs.append(agent.run_lecture(transcript, processor, args.workers, args.incremental))
+        elapsed = time.perf_counter() - start
+
+        print_throughput(runs, elapsed)
+
+    elif args.command == 'search':
+        if agent.notes_search is None:
+            print("Error: Full-text search needs SQLite with FTS5 support")
+            return
+
+        query = ' '.join(args.query)
+        results = agent.notes_search.search(query, args.limit)
+        if not results:
+            print(f"No finalized notes match: {query}")
+            return
+
+        print(f"\n{len(results)} result(s) for: {query}\n")
+        for result in results:
+            when = f" ({result['timestamp']})" if result['timestamp'] else ""
+            print(f"Lecture {result['lecture']:02d}{when} {result['header']}".rstrip())
+            print(f"  {' '.join(result['snippet'].split())}")
+            print(f"  {result['path']}:{result['line']}")
+            print()
+
     else:
         parser.print_help()
 
@@ -5,15 +5,43 @@ This script should be run within Claude Code environment
 """
 
 import os
+import sys
 import glob
 import re
+import argparse
 
+# Add agent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'agent'))
 
-def find_pending_segments():
+from manifest import list_manifests, existing_files
+from instructions import load_instructions
+from transcript_reader import TranscriptReader
+from job_queue import JobQueue, default_worker_id, PENDING, LEASED, DONE, FAILED
+
+
+def find_pending_segments(working_folder='working'):
     """Find all segments that haven't been processed yet"""
-    segments = glob.glob('working/*_segment.txt')
+    names = existing_files(working_folder)
     pending = []
 
+    # Manifests list every part; one directory listing tells which outputs exist
+    manifests = list_manifests(working_folder)
+    for manifest in manifests:
+        for part in manifest['parts']:
+            if os.path.basename(part['output_file']) not in names:
+                pending.append({
+                    'lecture_num': manifest['lecture_number'],
+                    'part_num': part['part_number'],
+                    'segment_file': part['segment_file'],
+                    'instruction_file': part['instruction_file'],
+                    'output_file': part['output_file']
+                })
+
+    # Segments prepared before manifests existed
+    manifest_lectures = {manifest['lecture_number'] for manifest in manifests}
+    segments = [seg for seg in glob.glob(f'{working_folder}/*_segment.txt')
+                if not _belongs_to(seg, manifest_lectures)]
+
     for seg_file in sorted(segments):
         basename = os.path.basename(seg_file)
         match = re.match(r'L(\d+)_PART(\d+)_segment\.txt', basename)
@@ -22,10 +50,10 @@ def find_pending_segments():
             lecture_num = int(match.group(1))
             part_num = int(match.group(2))
 
-            output_file = f'working/L{lecture_num:02d}_PART{part_num}_output.md'
-            instruction_file = f'working/L{lecture_num:02d}_PART{part_num}_instructions.md'
+            output_file = f'{working_folder}/L{lecture_num:02d}_PART{part_num}_output.md'
+            instruction_file = f'{working_folder}/L{lecture_num:02d}_PART{part_num}_instructions.md'
 
-            if not os.path.exists(output_file):
+            if os.path.basename(output_file) not in names:
                 pending.append({
                     'lecture_num': lecture_num,
                     'part_num': part_num,
@@ -37,6 +65,34 @@ def find_pending_segments():
     return pending
 
 
+def open_queue(working_folder='working', lease_seconds=30 * 60):
+    """Job queue shared by every worker on the working folder, synced with what is on disk"""
+    queue = JobQueue(os.path.join(working_folder, 'jobs.db'), lease_seconds=lease_seconds)
+    queue.sync()
+    return queue
+
+
+def claim_next_segment(queue, worker=None):
+    """Lease the next segment for this worker, or None when there is nothing left to do"""
+    job = queue.lease(worker)
+    if job is None:
+        return None
+    return {
+        'lecture_num': job['lecture'],
+        'part_num': job['part'],
+        'segment_file': job['segment_file'],
+        'instruction_file': job['instruction_file'],
+        'output_file': job['output_file'],
+        'worker': job['worker'],
+        'attempts': job['attempts']
+    }
+
+
+def _belongs_to(seg_file, lectures):
+    match = re.match(r'L(\d+)_PART', os.path.basename(seg_file))
+    return bool(match) and int(match.group(1)) in lectures
+
+
 def process_segment(segment_info):
     """
     Process a single segment - reads instructions and segment, outputs formatted notes
@@ -46,15 +102,14 @@ def process_segment(segment_info):
     print(f"Processing Lecture {segment_info['lecture_num']:02d} - Part {segment_info['part_num']}")
     print(f"{'='*70}\n")
 
-    # Read instruction file
-    with open(segment_info['instruction_file'], 'r', encoding='utf-8') as f:
-        instructions = f.read()
+    # Read instruction file, expanded against the shared template (read once per run)
+    instructions = load_instructions(segment_info['instruction_file'])
 
     print("Instructions loaded.")
 
-    # Read segment file
-    with open(segment_info['segment_file'], 'r', encoding='utf-8') as f:
-        segment_content = f.read()
+    # Read segment file (decoded once, straight from the mapping)
+    with TranscriptReader(segment_info['segment_file']) as reader:
+        segment_content = reader.text()
 
     print(f"Segment loaded: {len(segment_content)} characters")
     print("\nThis segment should now be processed according to the instructions.")
@@ -68,16 +123,108 @@ def process_segment(segment_info):
     }
 
 
+def print_queue_status(queue):
+    """Job counts and in-flight leases"""
+    counts = queue.counts()
+    print(f"\nQueue: {counts[PENDING]} pending, {counts[LEASED]} leased, "
+          f"{counts[DONE]} done, {counts[FAILED]} failed")
+    for job in queue.jobs(LEASED):
+        print(f"  - Lecture {job['lecture']:02d}, Part {job['part']} leased by {job['worker']}")
+    for job in queue.jobs(FAILED):
+        print(f"  ✗ Lecture {job['lecture']:02d}, Part {job['part']} failed: {job['error']}")
+
+
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description='Process prepared segments')
+    parser.add_argument('--working', default='working', help='Working folder (default: working)')
+    parser.add_argument('--next', action='store_true',
+                        help='Lease the next segment for this worker and show it')
+    parser.add_argument('--worker', default=None,
+                        help='Worker name for leases (default: host:pid)')
+    parser.add_argument('--lease', type=float, default=30 * 60, metavar='SECONDS',
+                        help='Lease timeout before a segment is handed to another worker (default: 1800)')
+    parser.add_argument('--done', nargs=2, type=int, metavar=('LECTURE', 'PART'),
+                        help='Mark a leased segment done')
+    parser.add_argument('--fail', nargs=3, metavar=('LECTURE', 'PART', 'ERROR'),
+                        help='Give a leased segment back (failed after 3 attempts)')
+    parser.add_argument('--renew', nargs=2, type=int, metavar=('LECTURE', 'PART'),
+                        help='Extend the lease on a segment this worker is still processing')
+    parser.add_argument('--retry-failed', action='store_true', help='Put failed segments back in the queue')
+    parser.add_argument('--status', action='store_true', help='Show queue counts and leases')
+    args = parser.parse_args()
+
+    queue = open_queue(args.working, args.lease)
+    try:
+        worker = args.worker or default_worker_id()
+        if args.done:
+            if queue.complete(*args.done, worker=worker):
+                print(f"✓ Lecture {args.done[0]:02d}, Part {args.done[1]} done")
+            elif any((job['lecture'], job['part']) == tuple(args.done) for job in queue.jobs(DONE)):
+                # sync already marked it done because its output exists
+                print(f"✓ Lecture {args.done[0]:02d}, Part {args.done[1]} already done")
+            else:
+                print(f"✗ Lecture {args.done[0]:02d}, Part {args.done[1]} is not leased by {worker}")
+            return
+        if args.fail:
+            lecture, part = int(args.fail[0]), int(args.fail[1])
+            if queue.fail(lecture, part, args.fail[2], worker=worker):
+                print(f"Lecture {lecture:02d}, Part {part} returned to the queue")
+            else:
+                print(f"✗ Lecture {lecture:02d}, Part {part} is not leased by {worker}")
+            return
+        if args.renew:
+            if queue.renew(*args.renew, worker=worker):
+                print(f"Lease on Lecture {args.renew[0]:02d}, Part {args.renew[1]} extended by {args.lease:.0f}s")
+            else:
+                print(f"✗ Lecture {args.renew[0]:02d}, Part {args.renew[1]} is not leased by {worker}")
+            return
+        if args.retry_failed:
+            print(f"{queue.retry_failed()} failed segment(s) queued again")
+            return
+        if args.status:
+            print_queue_status(queue)
+            return
+        if args.next:
+            segment_info = claim_next_segment(queue, worker)
+            if segment_info is None:
+                print("\n✓ No segments left to lease.")
+                print_queue_status(queue)
+                return
+            process_segment(segment_info)
+            print(f"Leased by {segment_info['worker']} (attempt {segment_info['attempts']}, "
+                  f"expires in {args.lease:.0f}s)")
+            return
+
+        list_pending(queue, args.working)
+    finally:
+        queue.close()
+
+
+def list_pending(queue, working_folder='working'):
+    """Print every segment still to process, in the order workers will lease them"""
     print("\n" + "="*70)
     print("SEGMENT PROCESSOR")
     print("="*70)
 
-    pending = find_pending_segments()
+    # Leasable jobs first, then segments prepared before manifests existed
+    pending = [{
+        'lecture_num': job['lecture'],
+        'part_num': job['part'],
+        'segment_file': job['segment_file'],
+        'instruction_file': job['instruction_file'],
+        'output_file': job['output_file']
+    } for job in queue.jobs(PENDING)]
+    queued = {(seg['lecture_num'], seg['part_num']) for seg in pending}
+    leased = {(job['lecture'], job['part']) for job in queue.jobs(LEASED)}
+    pending += [seg for seg in find_pending_segments(working_folder)
+                if (seg['lecture_num'], seg['part_num']) not in queued | leased]
 
     if not pending:
         print("\n✓ No pending segments found!")
+        if leased:
+            print_queue_status(queue)
+            return
         print("All segments have been processed.\n")
         print("To finalize lectures, use:")
         print("  python process_helper.py finalize <lecture_number>")
@@ -97,6 +244,8 @@ def main():
         parts = by_lecture[lecture_num]
         print(f"  Lecture {lecture_num:02d}: {len(parts)} parts")
 
+    print_queue_status(queue)
+
     print("\n" + "="*70)
     print("PROCESSING INSTRUCTIONS")
     print("="*70)
@@ -112,8 +261,12 @@ For each segment:
 You can either:
   a) Ask Claude Code to process each segment one by one
   b) Process them all at once if you provide this list to Claude Code
+  c) Run several workers, each taking segments with:
+       python process_segments.py --next --worker <name>
+     A segment is leased to one worker at a time; it is done once its output
+     file exists, and goes back to the queue if the lease expires.
 
-Segment list:
+Segment list (in lease order):
 """)
 
     for seg in pending: